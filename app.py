@@ -1,24 +1,27 @@
 import streamlit as st
-from streamlit_gsheets import GSheetsConnection  # 必須安裝 streamlit-gsheets
+# plotly / pandas / gspread 只在結果頁、寫入紀錄與管理員面板用到，改在第一次使用時才載入，
+# 歡迎頁不必等這些模組 (冷啟動時 pandas 由背景預載內容表的執行緒載入)
+import logging
+import numpy as np
+import os
+import threading
+import time
+from furealm import CHAKRA_ORDER, DATA_DIR
+from furealm.adaptive import chakra_locked, mbti_locked, plan_page, question_codes
+from furealm.answers import AnswerSheet
+from furealm.content import ContentStore
+from furealm.metrics import Metrics
+from furealm.result_logger import RESULT_COLUMNS, ResultLogger, ensure_header
+from furealm.report import build_report
+from furealm.scoring import ANSWER_A, ANSWER_B, CHAKRA_CODES, DIM_CODES, MBTI_DIMS, score_chakras, score_mbti
+from furealm.sheet_cache import SheetCache
+from furealm.sheets_client import CircuitBreaker, SheetsClient, SheetsUnavailable, TokenBucket
 
-# 建立 Google Sheets 連線
-conn = st.connection("gsheets", type=GSheetsConnection)
-import pandas as pd
-import plotly.express as px
-import random
-import re
+logger = logging.getLogger("furealm.app")
 
 # --- 1. 系統配置 ---
 st.set_page_config(page_title="最懂妳的Fùrealm", page_icon="✨", layout="centered")
 
-# MBTI 四大氣質對照表
-MBTI_GROUPS = {
-    "INTJ": "NT", "INTP": "NT", "ENTJ": "NT", "ENTP": "NT",
-    "INFJ": "NF", "INFP": "NF", "ENFJ": "NF", "ENFP": "NF",
-    "ISTJ": "SJ", "ISFJ": "SJ", "ESTJ": "SJ", "ESFJ": "SJ",
-    "ISTP": "SP", "ISFP": "SP", "ESTP": "SP", "ESFP": "SP"
-}
-
 # 讀取網址
 try:
     MBTI_URL = st.secrets["MBTI_CSV_URL"]
@@ -30,46 +33,112 @@ except:
     st.stop()
 
 # --- 2. 萬能讀取器 ---
-@st.cache_data
-def load_data_smart(url, type_name):
-    if not url: return None
-    try:
-        try: df = pd.read_csv(url, encoding='utf-8')
-        except: df = pd.read_csv(url, encoding='utf-8-sig') 
-        
-        df.columns = df.columns.str.strip()
-        
-        rename_map = {}
-        for col in df.columns:
-            c = col.lower().replace("_", "").replace(" ", "").replace("(", "").replace(")", "")
-            
-            # --- 通用欄位 ---
-            if any(x in c for x in ["題目", "問題", "question", "content"]): rename_map[col] = "Question"
-            elif any(x in c for x in ["模式", "type", "mode"]): rename_map[col] = "Mode"
-            elif any(x in c for x in ["維度", "dim"]): rename_map[col] = "Dimension"
-            elif "optiona" in c or "選項a" in c: rename_map[col] = "Option_A"
-            elif "optionb" in c or "選項b" in c: rename_map[col] = "Option_B"
-            elif any(x in c for x in ["分類", "脈輪", "category", "chakra", "focus"]): rename_map[col] = "Chakra_Category"
-            
-            # --- Logic 表專用 ---
-            elif "range" in c or "區間" in c: rename_map[col] = "Score_Range"
-            elif "status" in c or "狀態" in c or "label" in c: rename_map[col] = "Status"
-            elif "trigger" in c or "觸發" in c: rename_map[col] = "Trigger"
-            elif "copy" in c or "文案" in c or "action" in c: rename_map[col] = "Action_Copy"
-            elif "mapping" in c or "索引" in c or "logic" in c: rename_map[col] = "Product_Mapping"
-            
-            # --- Product 表專用 ---
-            elif "product" in c or "商品" in c or "id" in c: rename_map[col] = "Product_ID"
-            elif "name" in c or "名稱" in c: rename_map[col] = "Product_Name"
-            elif "gem" in c or "晶石" in c or "stone" in c: rename_map[col] = "Gemstones"
-            elif "link" in c or "連結" in c or "url" in c: rename_map[col] = "Store_Link"
-            elif "match" in c or "mbti" in c: rename_map[col] = "MBTI_Match"
-            elif "desc" in c or "說明" in c or "描述" in c: rename_map[col] = "Description"
-
-        df.rename(columns=rename_map, inplace=True)
-        return df
-    except Exception as e:
-        return None
+# 熱路徑計時 (METRICS_ENABLED = false 時完全不量測)；快照定期寫到 DATA_DIR/metrics 供外部抓取
+@st.cache_resource
+def get_metrics():
+    m = Metrics(enabled=st.secrets.get("METRICS_ENABLED", True))
+    m.start_exporter(os.path.join(DATA_DIR, "metrics"), st.secrets.get("METRICS_EXPORT_INTERVAL", 30))
+    return m
+
+metrics = get_metrics()
+
+# 正規化後的表格存成本機快照，重啟 / 重新部署後不必重新下載解析
+sheet_cache = SheetCache(os.path.join(DATA_DIR, "sheets"), max_age=st.secrets.get("SNAPSHOT_MAX_AGE", 300), metrics=metrics)
+
+# 回傳 (DataFrame, 內容雜湊, 錯誤訊息)；上游失敗但有本機快照時仍回傳快照並附上錯誤，
+# 完全讀不到時直接拋出，由 ContentStore 記錄並沿用上一版
+def load_data_smart(url, type_name, force=False):
+    if not url: return None, None, None
+    with metrics.timer(f"content.load.{type_name}"):
+        # 首次載入 (force=False) 不論快照新舊都直接用，ContentStore 隨即在背景向上游重新驗證
+        return sheet_cache.load_versioned(url, force=force, stale_ok=not force)
+
+# 內容表由背景執行緒定期重新驗證 (stale-while-revalidate)，使用者 rerun 不會卡在網路讀取
+@st.cache_resource
+def get_content_store():
+    sources = {"MBTI": MBTI_URL, "Chakra": CHAKRA_URL, "Logic": LOGIC_URL, "Product": PRODUCT_URL}
+    return ContentStore(sources, load_data_smart, refresh_interval=st.secrets.get("REFRESH_INTERVAL", 300)).start()
+
+# 行程啟動時 get_content_store() 即在背景同時下載四張表；使用者停留在歡迎 / 選擇頁時
+# 若首次載入失敗，退避時間過後就在背景重試，不阻塞當前頁面
+def prefetch_content():
+    get_content_store().prefetch()
+
+# 每個 session 釘住開始時的內容版本，測驗中途的更新不會換掉題庫
+def get_session_content():
+    store = get_content_store()
+    version = st.session_state.get("content_version")
+    content = store.get(version) if version else None
+    if version and content is None and st.session_state.step in ("mbti_quiz", "chakra_quiz"):
+        # 釘住的版本已被淘汰 (測驗中途內容更新太多次)，題目 id 對應不到目前題庫，只能重新開始
+        metrics.incr("content.pinned_evicted")
+        st.session_state.clear()
+        st.session_state.content_reset = True
+        st.rerun()
+    if content is None:
+        # 尚未開始作答 / 已在結果頁 (只用 Logic、Product 表) 時改釘目前版本即可
+        content = store.current()
+    if content is not None:
+        st.session_state.content_version = content.version
+    return content
+
+@metrics.timed("radar.build")
+def build_radar_figure(radar_key):
+    import pandas as pd
+    import plotly.express as px
+    converted_scores = dict(zip(CHAKRA_ORDER, radar_key))
+    
+    # --- 雷達圖優化：數值與名稱合併顯示 ---
+    
+    # 1. 準備包含數值的標籤 (例如：頂輪 81)
+    # 我們把標籤與數值結合，讓它顯示在最外圈
+    label_with_scores = [f"{k} {v:.0f}" for k, v in converted_scores.items()]
+    
+    df_plot = pd.DataFrame(dict(
+        r=list(converted_scores.values()), 
+        theta=label_with_scores  # 使用結合後的標籤
+    ))
+    
+    fig = px.line_polar(df_plot, r='r', theta='theta', line_close=True, 
+                        color_discrete_sequence=['#d4af37'])
+    
+    # 2. 填充顏色與線條強化 (移除點上的浮動數字，因為已經在標籤裡了)
+    fig.update_traces(
+        fill='toself', 
+        fillcolor='rgba(212, 175, 55, 0.3)', 
+        line=dict(width=4),
+        marker=dict(size=8)
+    )
+    
+    # 3. 外圈標籤優化
+    fig.update_polars(
+        angularaxis=dict(
+            tickfont=dict(size=15, color="#d4af37", family="Arial Black"), 
+            rotation=90, 
+            direction="clockwise",
+            # 增加一些間距，避免文字太貼近圖表
+            ticks="outside",
+            ticklen=10
+        ),
+        radialaxis=dict(
+            visible=True, 
+            range=[0, 100], 
+            showticklabels=False, # 隱藏中心軸數字，保持畫面簡潔
+            gridcolor="#eeeeee"
+        )
+    )
+    return fig
+
+# 雷達圖依分數向量快取，分數相同的用戶共用同一個 Figure (渲染時只讀不改)
+get_radar_figure = st.cache_resource(max_entries=4096)(build_radar_figure)
+
+# 結果頁第一次畫雷達圖要載入 plotly 的模板與驗證器，脈輪測驗進行中先在背景預熱一次
+# (直接呼叫未快取的版本，背景執行緒不碰 Streamlit 的 session 狀態)
+@st.cache_resource
+def warm_result_page():
+    thread = threading.Thread(target=build_radar_figure, args=((0.0,) * len(CHAKRA_ORDER),), name="radar-warmup", daemon=True)
+    thread.start()
+    return thread
 
 # --- 3. CSS 優化 (新增 HTML 按鈕樣式) ---
 st.markdown("""
@@ -151,39 +220,118 @@ st.markdown("""
 # --- 4. 狀態管理 ---
 if "step" not in st.session_state:
     st.session_state.step = "welcome"
-    st.session_state.mbti_answers = []
-    st.session_state.chakra_answers = {}
+    # 作答以陣列保存 (分類代碼 + 分數)，抽題時依題數重新配置
+    st.session_state.mbti_answers = AnswerSheet(0)
+    st.session_state.chakra_answers = AnswerSheet(0)
     st.session_state.mbti_res = "INFJ"
     st.session_state.chakra_res = {}
-    st.session_state.current_questions = []
-
-# 抽題邏輯
-def draw_questions(df, type_col, categories, count_per_cat):
-    selected_indices = []
-    for cat in categories:
-        subset = df[df[type_col] == cat]
-        if not subset.empty:
-            n = min(len(subset), count_per_cat)
-            selected = subset.sample(n=n)
-            selected_indices.extend(selected.index.tolist())
-    random.shuffle(selected_indices)
-    return df.loc[selected_indices].reset_index(drop=True)
+    st.session_state.current_questions = []  # 只存題目 id (對應 session 釘住版本的題庫)
+
+# QuizResults 只做 append (不再整張讀回再覆寫)，由背景 worker 批次寫出
+# 所有 Sheets API 呼叫共用同一個令牌桶 / 斷路器，配額依 Google 預設每分鐘 60 次
+@st.cache_resource
+def get_sheets_client():
+    return SheetsClient(
+        TokenBucket(per_minute=st.secrets.get("SHEETS_QUOTA_PER_MIN", 60), burst=st.secrets.get("SHEETS_BURST", 10)),
+        CircuitBreaker(failure_threshold=5, reset_timeout=st.secrets.get("SHEETS_BREAKER_RESET", 60)),
+    )
+
+# Google Sheets 連線延後到第一次寫入 / 讀取 QuizResults 才建立 (st.connection 本身會快取)
+def get_conn():
+    from streamlit_gsheets import GSheetsConnection  # 必須安裝 streamlit-gsheets
+    return st.connection("gsheets", type=GSheetsConnection)
+
+def _open_quiz_worksheet():
+    worksheet = get_conn().client._select_worksheet(worksheet="QuizResults")
+    # 舊試算表的表頭只有前四欄，第一次使用時補上各脈輪欄位名稱 (匯出 / 批次重算才認得)
+    ensure_header(worksheet)
+    return worksheet
+
+def get_quiz_worksheet(acquire_timeout=None):
+    # open_by_url + worksheet() + 讀表頭共三個請求，handle 取得後重複使用，之後每次寫入 / 讀取只剩一個請求
+    return get_sheets_client().handle("QuizResults", _open_quiz_worksheet, cost=3, acquire_timeout=acquire_timeout)
+
+@metrics.timed("sheets.append")
+def _append_rows_now(worksheet, rows):
+    worksheet.append_rows(rows, value_input_option="USER_ENTERED")
+
+def _append_quiz_results(rows):
+    # 降級模式下直接失敗，資料留在 journal 由 ResultLogger 稍後重送
+    get_sheets_client().write(_append_rows_now, get_quiz_worksheet(), rows)
+    metrics.incr("sheets.appended_rows", len(rows))
+
+@st.cache_resource
+def get_result_logger():
+    return ResultLogger(_append_quiz_results, os.path.join(DATA_DIR, "quiz_results.journal"))
+
 def log_result_to_sheets(mbti, chakra_res):
     try:
         # 抓取最低分的脈輪作為紀錄重點
         lowest_chakra = min(chakra_res, key=chakra_res.get)
-        new_row = pd.DataFrame([{
-            "Timestamp": pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S'),
+        row = {
+            "Timestamp": time.strftime('%Y-%m-%d %H:%M:%S'),
             "MBTI": mbti,
             "Chakra": lowest_chakra,
-            "Action": "72H_Campaign"
-        }])
-        # 寫入指定的 QuizResults 分頁
-        existing_data = conn.read(worksheet="QuizResults")
-        updated_df = pd.concat([existing_data, new_row], ignore_index=True)
-        conn.update(worksheet="QuizResults", data=updated_df)
-    except:
-        pass # 為了不影響用戶測驗，失敗時靜默跳過
+            "Action": "72H_Campaign",
+            **{k: round(v, 4) for k, v in chakra_res.items()}
+        }
+        # 先寫入本機 journal 再排入佇列，寫入失敗會保留重試，不影響用戶測驗
+        get_result_logger().enqueue([row.get(c, "") for c in RESULT_COLUMNS])
+    except Exception:
+        # journal 寫不進去 (磁碟滿 / 唯讀) 時只記錄，報告照常顯示
+        logger.exception("QuizResults 紀錄失敗")
+        metrics.incr("quiz_results.log_errors")
+
+# 管理員儀表板：只向 QuizResults 要高水位線之後的新列，增量更新彙總
+@metrics.timed("sheets.read")
+def _fetch_quiz_results_since(start, worksheet=None):
+    if worksheet is None:
+        # 公開試算表無法指定範圍，只能整張讀回再取尾端
+        records = get_conn().read(worksheet="QuizResults", ttl=0).iloc[start:].to_dict('records')
+        return records, len(records)
+    header, body = worksheet.batch_get(["1:1", f"A{start + 2}:Z"])
+    header = header[0] if header else RESULT_COLUMNS
+    # 空白列不彙總，但游標要依原始列數前進，否則之後每次都會重讀尾端
+    return [dict(zip(header, values)) for values in body if any(values)], len(body)
+
+def _read_quiz_results_since(start):
+    # 多位管理員同時開面板時，相同範圍的讀取只送出一次；儀表板不為配額久等 (開啟工作表也一樣)
+    worksheet = get_quiz_worksheet(acquire_timeout=3) if hasattr(get_conn().client, "_select_worksheet") else None
+    return get_sheets_client().read(("QuizResults", start), _fetch_quiz_results_since, start, worksheet, acquire_timeout=3)
+
+@st.cache_resource
+def get_result_aggregates():
+    from furealm.analytics import ResultAggregates
+    return ResultAggregates()
+
+# AI 個人化解讀 (選用)：NARRATIVE_MODE = "gemini" 需搭配 GEMINI_API_KEY，"stub" 為本機示範文字，未設定則不顯示
+@st.cache_resource
+def get_narrative_service():
+    from furealm import narrative
+    mode = st.secrets.get("NARRATIVE_MODE", "")
+    if mode == "gemini" and st.secrets.get("GEMINI_API_KEY"):
+        generator = narrative.gemini_generator(st.secrets["GEMINI_API_KEY"], st.secrets.get("NARRATIVE_MODEL", narrative.DEFAULT_MODEL))
+    elif mode == "stub":
+        generator = narrative.stub_generator()
+    else:
+        return None
+    cache = narrative.NarrativeCache(max_bytes=int(st.secrets.get("NARRATIVE_CACHE_MB", 2) * 1024 * 1024))
+    return narrative.NarrativeService(generator, cache, bucket=st.secrets.get("NARRATIVE_BUCKET", 10))
+
+# 分享圖 (雷達圖 + 推薦卡片) 存在 DATA_DIR/snapshots；預設輸出 PNG (Pillow 見 requirements.txt，
+# 中文字型由 packages.txt 安裝的 fonts-noto-cjk 或 SNAPSHOT_FONT 提供)，缺任一項時才退回 SVG
+@st.cache_resource
+def get_snapshot_cache():
+    from furealm.snapshot import SnapshotCache
+    return SnapshotCache(os.path.join(DATA_DIR, "snapshots"), max_bytes=int(st.secrets.get("SNAPSHOT_CACHE_MB", 64) * 1024 * 1024))
+
+def get_snapshot(report):
+    from furealm import snapshot
+    font = st.secrets.get("SNAPSHOT_FONT")
+    fmt = "png" if snapshot.png_available(font) else "svg"
+    render = (lambda key: snapshot.render_png(key, font)) if fmt == "png" else snapshot.render_svg
+    with metrics.timer(f"snapshot.{fmt}"):
+        return get_snapshot_cache().get_or_render(snapshot.snapshot_key(report), fmt, render), fmt
 
 # 側邊欄
 with st.sidebar:
@@ -200,22 +348,166 @@ with st.sidebar:
         st.divider()
         admin_pwd = st.text_input("💎 管理員密碼", type="password")
         if admin_pwd == "furealm888":
+            import pandas as pd
+            import plotly.express as px
+            store = get_content_store()
+            current = store.current()
+            if current is not None:
+                refreshed_at = pd.Timestamp.fromtimestamp(store.last_refreshed or current.loaded_at).strftime('%Y-%m-%d %H:%M:%S')
+                st.caption(f"內容版本：{current.version} (最後更新 {refreshed_at})")
+            if store.last_error:
+                st.caption(f"⚠️ 最近一次更新失敗，沿用舊版本：{store.last_error}")
             st.subheader("📈 72H 即時數據")
+            log_stats = get_result_logger().stats
+            st.caption(f"寫入佇列：待寫入 {get_result_logger().pending_count()} / 已寫入 {log_stats['flushed']} / 失敗重試 {log_stats['failed']} (本次啟動共 {log_stats['queued']} 筆)")
+            agg = get_result_aggregates()
             try:
-                raw_data = conn.read(worksheet="QuizResults")
-                if not raw_data.empty:
-                    st.write(f"總測驗人數: {len(raw_data)}")
-                    fig_pie = px.pie(raw_data, names='Chakra', title="目前脈輪缺口比例", hole=0.3)
-                    st.plotly_chart(fig_pie, use_container_width=True)
-                else:
-                    st.write("尚無數據")
+                agg.refresh(_read_quiz_results_since)
+            except SheetsUnavailable as e:
+                st.warning(f"Google Sheets 暫時無法使用，顯示上次的統計：{e}")
             except Exception as e:
                 st.write("數據讀取中，請稍候...")
+            m = get_sheets_client().metrics()
+            st.caption(f"Sheets API：{m['breaker']} / 呼叫 {m['calls']} / 重試 {m['retries']} / 節流 {m['throttled']} ({m['throttle_wait']:.1f}s) / 拒絕 {m['rejected']} / 合併 {m['coalesced']}")
+            if get_narrative_service() is not None:
+                nc = get_narrative_service().cache
+                st.caption(f"AI 解讀快取：{len(nc)} 筆 / {nc.size / 1024:.0f} KB，命中 {nc.stats['hits']} / 未命中 {nc.stats['misses']} / 淘汰 {nc.stats['evictions']}")
+            sc = get_snapshot_cache()
+            st.caption(f"分享圖快取：{len(sc)} 張 / {sc.size / 1024:.0f} KB，命中 {sc.stats['hits']} / 未命中 {sc.stats['misses']} / 淘汰 {sc.stats['evictions']}")
+            if metrics.enabled:
+                with st.expander("⏱️ 效能指標"):
+                    snap = metrics.snapshot()
+                    if snap["timers"]:
+                        timers = pd.DataFrame(snap["timers"]).T
+                        ms_cols = ["mean", "p50", "p95", "p99", "max"]
+                        timers[ms_cols] = (timers[ms_cols] * 1000).round(1)
+                        st.caption("各階段耗時 (ms)")
+                        st.dataframe(timers[["count"] + ms_cols], use_container_width=True)
+                    if snap["counters"]:
+                        st.dataframe(pd.Series(snap["counters"], name="count"), use_container_width=True)
+                    c1, c2 = st.columns(2)
+                    c1.download_button("JSON", metrics.to_json(), "furealm-metrics.json", "application/json")
+                    c2.download_button("Prometheus", metrics.to_text(), "furealm-metrics.prom", "text/plain")
+
+            if agg.total:
+                st.write(f"總測驗人數: {agg.total}")
+                tab_pie, tab_cross, tab_time = st.tabs(["脈輪缺口", "MBTI x 脈輪", "72H 趨勢"])
+                with tab_pie:
+                    chakra_counts = agg.chakra_counts()
+                    fig_pie = px.pie(names=chakra_counts.index, values=chakra_counts.values, title="目前脈輪缺口比例", hole=0.3)
+                    st.plotly_chart(fig_pie, use_container_width=True)
+                with tab_cross:
+                    cross = agg.crosstab()
+                    fig_cross = px.imshow(cross, text_auto=True, aspect="auto", color_continuous_scale="YlOrBr", title="MBTI x 最低脈輪")
+                    st.plotly_chart(fig_cross, use_container_width=True)
+                with tab_time:
+                    hourly = agg.hourly_series(72)
+                    fig_time = px.bar(x=hourly.index, y=hourly.values, labels={"x": "時間", "y": "人數"}, title="每小時測驗人數 (72H)")
+                    fig_time.update_traces(marker_color="#d4af37")
+                    st.plotly_chart(fig_time, use_container_width=True)
+                st.caption(f"最新紀錄時間: {agg.high_water_mark}")
+            else:
+                st.write("尚無數據")
+
+
+# --- 5. 測驗作答區 (fragment) ---
+# 作答只重跑 fragment，不重跑整支 app.py；一頁 QUIZ_PAGE_SIZE 題用 form 一次送出，
+# 作答在 on_click callback 中寫入，因此每頁只需一次來回。設為 1 則維持一題一按的介面。
+QUIZ_PAGE_SIZE = max(1, int(st.secrets.get("QUIZ_PAGE_SIZE", 5)))
+# 自適應出題：結果已確定的 MBTI 維度 / 脈輪不再出題 (ADAPTIVE_CONFIDENCE_Z 未設定時保證結果與完整作答相同)
+ADAPTIVE_QUIZ = bool(st.secrets.get("ADAPTIVE_QUIZ", True))
+ADAPTIVE_CONFIDENCE_Z = st.secrets.get("ADAPTIVE_CONFIDENCE_Z", None)
+# 自適應時結果確定就提早結束，實際題數可能少於上限
+UP_TO = "最多 " if ADAPTIVE_QUIZ else ""
+
+def _answer_mbti(idx, dim_code, value):
+    st.session_state.mbti_answers.record(idx, dim_code, value)
+
+def _submit_mbti_page(positions, codes):
+    picks = [st.session_state.get(f"mq{pos}") for pos in positions]
+    if any(p is None for p in picks):
+        st.session_state.quiz_page_error = True; return
+    st.session_state.quiz_page_error = False
+    for pos, pick in zip(positions, picks):
+        st.session_state.mbti_answers.record(pos, codes[pos], pick)
 
+def _submit_chakra_page(positions, codes):
+    for pos in positions:
+        st.session_state.chakra_answers.record(pos, codes[pos], st.session_state.get(f"c{pos}", 3))
+
+@st.fragment
+@metrics.timed("fragment.mbti_quiz")
+def mbti_quiz_fragment():
+    bank = get_session_content().mbti_bank
+    qs = st.session_state.current_questions
+    answers = st.session_state.mbti_answers
+    codes = question_codes(bank, qs, 'Dimension', DIM_CODES)
+    locked = mbti_locked(codes, answers) if ADAPTIVE_QUIZ else None
+    page = plan_page(codes, answers, locked, QUIZ_PAGE_SIZE)
+    
+    if page:
+        asked = answers.asked()
+        st.progress((page[-1]+1)/len(qs))
+        if QUIZ_PAGE_SIZE == 1:
+            idx = page[0]
+            row = bank.row(qs[idx])
+            st.subheader(f"Q{asked+1}: {row['Question']}")
+            c1, c2 = st.columns(2)
+            c1.button(str(row['Option_A']), key=f"ma{idx}", on_click=_answer_mbti, args=(idx, codes[idx], ANSWER_A))
+            c2.button(str(row['Option_B']), key=f"mb{idx}", on_click=_answer_mbti, args=(idx, codes[idx], ANSWER_B))
+            return
+        with st.form(f"mbti_page_{page[0]}"):
+            for j, pos in enumerate(page):
+                row = bank.row(qs[pos])
+                st.subheader(f"Q{asked+j+1}: {row['Question']}")
+                options = {ANSWER_A: str(row['Option_A']), ANSWER_B: str(row['Option_B'])}
+                st.radio(f"Q{asked+j+1}", list(options), format_func=options.get, index=None, key=f"mq{pos}", label_visibility="collapsed")
+            if st.session_state.get("quiz_page_error"):
+                st.warning("請完成本頁所有題目再繼續")
+            st.form_submit_button("下一頁", on_click=_submit_mbti_page, args=(page, codes))
+    else:
+        with metrics.timer("score.mbti"):
+            st.session_state.mbti_res = score_mbti(answers)
+        st.session_state.step = "chakra_pre"
+        st.session_state.current_questions = []
+        st.rerun()
+
+@st.fragment
+@metrics.timed("fragment.chakra_quiz")
+def chakra_quiz_fragment():
+    content = get_session_content()
+    bank = content.chakra_bank
+    qs = st.session_state.current_questions
+    answers = st.session_state.chakra_answers
+    codes = question_codes(bank, qs, 'Chakra_Category', CHAKRA_CODES)
+    locked = chakra_locked(codes, answers, content.logic_index, z=ADAPTIVE_CONFIDENCE_Z) if ADAPTIVE_QUIZ else None
+    page = plan_page(codes, answers, locked, QUIZ_PAGE_SIZE)
+    
+    if page:
+        asked = answers.asked()
+        st.progress((page[-1]+1)/len(qs))
+        with st.form(f"chakra_page_{page[0]}"):
+            for j, pos in enumerate(page):
+                row = bank.row(qs[pos])
+                st.subheader(f"Q{asked+j+1}: {row['Question']}")
+                st.slider("符合程度 (1-5)", 1, 5, 3, key=f"c{pos}")
+            st.form_submit_button("下一題" if QUIZ_PAGE_SIZE == 1 else "下一頁", on_click=_submit_chakra_page, args=(page, codes))
+    else:
+        with metrics.timer("score.chakras"):
+            st.session_state.chakra_res = score_chakras(answers)
+        st.session_state.step = "result"; st.rerun()
+
+# 每個頁面整次執行的耗時 (以 st.rerun / st.stop 換頁的那次不計，次數另計)
+current_step = st.session_state.step
+metrics.incr(f"step.{current_step}.runs")
+step_started = time.perf_counter()
 
 # 頁面 A: 歡迎
 if st.session_state.step == "welcome":
+    prefetch_content()
     st.title("✨ Fù Realm 能量診斷")
+    if st.session_state.pop("content_reset", False):
+        st.warning("題庫剛更新，請重新開始測驗 🙏")
     st.info("數據化靈魂解讀：MBTI x 脈輪能量")
     
     c1, c2, c3 = st.columns(3)
@@ -226,92 +518,69 @@ if st.session_state.step == "welcome":
     with c2:
         if st.button("🔍 探索型"): 
             st.session_state.mbti_mode = "Explore"; st.session_state.current_questions = []; st.session_state.step = "mbti_quiz"; st.rerun()
-        st.markdown("<p style='font-size:0.85em; color:#888; text-align:center;'>快問快答 20 題</p>", unsafe_allow_html=True)
+        st.markdown(f"<p style='font-size:0.85em; color:#888; text-align:center;'>快問快答 {UP_TO}20 題</p>", unsafe_allow_html=True)
     with c3:
         if st.button("💎 深層型"): 
             st.session_state.mbti_mode = "Deep"; st.session_state.current_questions = []; st.session_state.step = "mbti_quiz"; st.rerun()
-        st.markdown("<p style='font-size:0.85em; color:#888; text-align:center;'>60 題完整檢測</p>", unsafe_allow_html=True)
+        st.markdown(f"<p style='font-size:0.85em; color:#888; text-align:center;'>{UP_TO}60 題完整檢測</p>", unsafe_allow_html=True)
 
 # 頁面 B: 已知型輸入
 elif st.session_state.step == "mbti_input":
+    prefetch_content()
     m = st.selectbox("選擇您的 MBTI", ["INTJ","INFP","ENFJ","ENTP","ISTJ","ISFP","ESTP","ESFJ","INFJ","ENTJ","INTP","ENFP","ISTP","ISFJ","ESTJ","ESFP"])
     if st.button("下一步"):
         st.session_state.mbti_res = m; st.session_state.step = "chakra_pre"; st.rerun()
 
 # 頁面 C: MBTI 測驗
 elif st.session_state.step == "mbti_quiz":
-    if not isinstance(st.session_state.current_questions, pd.DataFrame):
-        df = load_data_smart(MBTI_URL, "MBTI")
-        if df is None: st.stop()
-        if st.session_state.mbti_mode == "Explore":
-            dims = ['E / I', 'S / N', 'T / F', 'J / P']
-            qs = draw_questions(df, 'Dimension', dims, 5)
-        else: qs = df
+    content = get_session_content()
+    bank = content.mbti_bank if content else None
+    if bank is None:
+        st.error("題庫暫時無法載入，請稍後重新整理再試。")
+        st.stop()
+    if not isinstance(st.session_state.current_questions, np.ndarray):
+        with metrics.timer("quiz.draw"):
+            if st.session_state.mbti_mode == "Explore":
+                qs = bank.draw(MBTI_DIMS, 5)
+            else: qs = bank.all_ids()
         st.session_state.current_questions = qs
-    
-    qs = st.session_state.current_questions
-    idx = len(st.session_state.mbti_answers)
-    
-    if idx < len(qs):
-        row = qs.iloc[idx]
-        st.progress((idx+1)/len(qs))
-        st.subheader(f"Q{idx+1}: {row['Question']}")
-        c1, c2 = st.columns(2)
-        if c1.button(str(row['Option_A']), key=f"ma{idx}"): st.session_state.mbti_answers.append({'dim': row['Dimension'], 'score': 'A'}); st.rerun()
-        if c2.button(str(row['Option_B']), key=f"mb{idx}"): st.session_state.mbti_answers.append({'dim': row['Dimension'], 'score': 'B'}); st.rerun()
-    else:
-        res_df = pd.DataFrame(st.session_state.mbti_answers)
-        final_mbti = ""
-        if not res_df.empty and 'dim' in res_df.columns:
-            for d in ['E / I', 'S / N', 'T / F', 'J / P']:
-                sub = res_df[res_df['dim'] == d]
-                a_count = (sub['score']=='A').sum(); b_count = (sub['score']=='B').sum()
-                final_mbti += d[0] if a_count >= b_count else d[4]
-        st.session_state.mbti_res = final_mbti
-        st.session_state.step = "chakra_pre"
-        st.session_state.current_questions = []
-        st.rerun()
+        st.session_state.mbti_answers = AnswerSheet(len(qs))
+    mbti_quiz_fragment()
 
 # 頁面 D: 脈輪前導
 elif st.session_state.step == "chakra_pre":
+    prefetch_content()
     st.success(f"MBTI 分析結果: {st.session_state.mbti_res}")
     c1, c2 = st.columns(2)
     with c1:
         if st.button("⚡ 快速檢測"): 
             st.session_state.chakra_mode = "Quick"; st.session_state.current_questions = []; st.session_state.step = "chakra_quiz"; st.rerun()
-        st.markdown("<p style='font-size:0.85em; color:#888; text-align:center;'>28 題快閃速測</p>", unsafe_allow_html=True)
+        st.markdown(f"<p style='font-size:0.85em; color:#888; text-align:center;'>{UP_TO}28 題快閃速測</p>", unsafe_allow_html=True)
     with c2:
         if st.button("🔮 深度檢測"): 
             st.session_state.chakra_mode = "Deep"; st.session_state.current_questions = []; st.session_state.step = "chakra_quiz"; st.rerun()
-        st.markdown("<p style='font-size:0.85em; color:#888; text-align:center;'>56 題精準評估</p>", unsafe_allow_html=True)
+        st.markdown(f"<p style='font-size:0.85em; color:#888; text-align:center;'>{UP_TO}56 題精準評估</p>", unsafe_allow_html=True)
 
 # 頁面 E: 脈輪測驗
 elif st.session_state.step == "chakra_quiz":
-    if not isinstance(st.session_state.current_questions, pd.DataFrame):
-        df_c = load_data_smart(CHAKRA_URL, "Chakra")
-        if df_c is None: st.stop()
-        chakras = ["海底輪", "臍輪", "太陽輪", "心輪", "喉輪", "眉心輪", "頂輪"]
+    content = get_session_content()
+    bank = content.chakra_bank if content else None
+    if bank is None:
+        st.error("題庫暫時無法載入，請稍後重新整理再試。")
+        st.stop()
+    if not isinstance(st.session_state.current_questions, np.ndarray):
+        chakras = CHAKRA_ORDER
         count = 4 if st.session_state.chakra_mode == "Quick" else 8
-        qs = draw_questions(df_c, 'Chakra_Category', chakras, count)
+        with metrics.timer("quiz.draw"):
+            qs = bank.draw(chakras, count)
         st.session_state.current_questions = qs
-        
-    qs = st.session_state.current_questions
-    idx = len(st.session_state.chakra_answers)
-    
-    if idx < len(qs):
-        row = qs.iloc[idx]
-        st.progress((idx+1)/len(qs))
-        st.subheader(f"Q{idx+1}: {row['Question']}")
-        val = st.slider("符合程度 (1-5)", 1, 5, 3, key=f"c{idx}")
-        if st.button("下一題"):
-            st.session_state.chakra_answers[idx] = {'cat': row['Chakra_Category'], 'val': val}; st.rerun()
-    else:
-        res_df = pd.DataFrame(st.session_state.chakra_answers).T
-        st.session_state.chakra_res = res_df.groupby('cat')['val'].mean().to_dict()
-        st.session_state.step = "result"; st.rerun()
+        st.session_state.chakra_answers = AnswerSheet(len(qs))
+    warm_result_page()
+    chakra_quiz_fragment()
 
 # 頁面 F: 結果報告
 elif st.session_state.step == "result":
+    import pandas as pd
     # 觸發自動存檔 (確保只存一次)
     if "data_logged" not in st.session_state:
         log_result_to_sheets(st.session_state.mbti_res, st.session_state.chakra_res)
@@ -324,104 +593,53 @@ elif st.session_state.step == "result":
         <p style="color:#555; margin:8px 0; font-size:1em;">讓我們一起，找出真正卡住的地方。</p>
     </div>
     """, unsafe_allow_html=True)
-    df_logic = load_data_smart(LOGIC_URL, "Logic")
-    df_prod = load_data_smart(PRODUCT_URL, "Product")
+    # 報告只在測驗結束後算一次，之後的 rerun (展開解析、點按鈕) 直接渲染
+    if "report" not in st.session_state:
+        with metrics.timer("report.build"):
+            st.session_state.report = build_report(st.session_state.chakra_res, st.session_state.mbti_res, get_session_content())
+    report = st.session_state.report
     
-    scores = st.session_state.chakra_res
-    user_mbti = st.session_state.mbti_res
-    user_group = MBTI_GROUPS.get(user_mbti.upper(), "")
+    user_mbti = report.mbti
+    user_group = report.group
     
     st.title("🔮 全方位能量診斷報告")
     st.markdown(f"**MBTI 類型：{user_mbti} ({user_group}型氣質)**")
     
-    # 分數換算
-    ordered_chakras = ["海底輪", "臍輪", "太陽輪", "心輪", "喉輪", "眉心輪", "頂輪"]
-    final_scores = {k: scores.get(k, 0) for k in ordered_chakras}
-    converted_scores = {k: (v - 1) * 25 for k, v in final_scores.items()} 
-    
-    # --- 雷達圖優化：數值與名稱合併顯示 ---
-    
-    # 1. 準備包含數值的標籤 (例如：頂輪 81)
-    # 我們把標籤與數值結合，讓它顯示在最外圈
-    label_with_scores = [f"{k} {v:.0f}" for k, v in converted_scores.items()]
-    
-    df_plot = pd.DataFrame(dict(
-        r=list(converted_scores.values()), 
-        theta=label_with_scores  # 使用結合後的標籤
-    ))
-    
-    fig = px.line_polar(df_plot, r='r', theta='theta', line_close=True, 
-                        color_discrete_sequence=['#d4af37'])
-    
-    # 2. 填充顏色與線條強化 (移除點上的浮動數字，因為已經在標籤裡了)
-    fig.update_traces(
-        fill='toself', 
-        fillcolor='rgba(212, 175, 55, 0.3)', 
-        line=dict(width=4),
-        marker=dict(size=8)
-    )
-    
-    # 3. 外圈標籤優化
-    fig.update_polars(
-        angularaxis=dict(
-            tickfont=dict(size=15, color="#d4af37", family="Arial Black"), 
-            rotation=90, 
-            direction="clockwise",
-            # 增加一些間距，避免文字太貼近圖表
-            ticks="outside",
-            ticklen=10
-        ),
-        radialaxis=dict(
-            visible=True, 
-            range=[0, 100], 
-            showticklabels=False, # 隱藏中心軸數字，保持畫面簡潔
-            gridcolor="#eeeeee"
-        )
-    )
-    # 優化後的截圖說明：字體縮小、增加換行適應手機
-    st.markdown("""
-        <p style='text-align:right; color:#999; font-size:0.7em; margin-bottom:-15px; line-height:1.2;'>
-            📸 點擊圖表右上相機圖標下載<br>或直接手機截圖報告
-        </p>
-    """, unsafe_allow_html=True)
-    st.plotly_chart(fig, use_container_width=True)
+    ordered_chakras = CHAKRA_ORDER
+    converted_scores = report.scores()
+    # 靜態圖片不需要瀏覽器下載 plotly，低階手機較快；圖由伺服器端畫好並快取
+    views = ["互動圖表", "靜態圖片"]
+    view = st.radio("圖表顯示", views, horizontal=True, key="chart_view",
+                    index=1 if st.secrets.get("RESULT_CHART_VIEW", "interactive") == "static" else 0)
+    if view == "靜態圖片":
+        snapshot_data, snapshot_fmt = get_snapshot(report)
+        st.markdown("""
+            <p style='text-align:right; color:#999; font-size:0.7em; margin-bottom:0; line-height:1.2;'>
+                📸 長按圖片或點下方按鈕儲存分享
+            </p>
+        """, unsafe_allow_html=True)
+        st.image(snapshot_data if snapshot_fmt == "png" else snapshot_data.decode("utf-8"), use_container_width=True)
+        st.download_button("⬇️ 下載分享圖", snapshot_data, file_name=f"furealm-{user_mbti}.{snapshot_fmt}",
+                           mime="image/png" if snapshot_fmt == "png" else "image/svg+xml")
+    else:
+        metrics.incr("radar.requests")
+        fig = get_radar_figure(report.radar_key)
+        # 優化後的截圖說明：字體縮小、增加換行適應手機
+        st.markdown("""
+            <p style='text-align:right; color:#999; font-size:0.7em; margin-bottom:-15px; line-height:1.2;'>
+                📸 點擊圖表右上相機圖標下載<br>或直接手機截圖報告
+            </p>
+        """, unsafe_allow_html=True)
+        st.plotly_chart(fig, use_container_width=True)
     
     st.divider()
     st.subheader("📊 脈輪能量深度解析")
     # 新增說明引導
     st.markdown("<p style='color:#d4af37; font-weight:bold; font-size:1em; margin-bottom:10px;'>🔍 哪裡能量卡住了？點擊下方區塊展開詳細解析與建議 〉</p>", unsafe_allow_html=True)
     
-    # --- 核心邏輯：使用 Regex 解析數字 ---
-    def get_advice_dynamic(chakra, score):
-        if df_logic is None or df_logic.empty: return None
-        
-        # 1. 篩選脈輪 (模糊比對)
-        rules = df_logic[df_logic['Chakra_Category'].astype(str).str.contains(chakra[:2], na=False)]
-        
-        for _, row in rules.iterrows():
-            try:
-                # 2. 處理分數區間 (Regex 抓取所有數字)
-                range_str = str(row['Score_Range']).strip()
-                matches = re.findall(r'\d+', range_str)
-                
-                if len(matches) >= 2:
-                    min_v = int(matches[0])
-                    max_v = int(matches[1])
-                    
-                    if min_v <= score <= max_v:
-                        return {
-                            "status": row.get('Status', 'Status'),
-                            "trigger": row.get('Trigger', ''),
-                            "copy": row.get('Action_Copy', '暫無建議')
-                        }
-            except Exception as e:
-                continue
-        return None
-
     # 顯示分析
-    for chakra in ordered_chakras:
+    for chakra, advice_data in zip(ordered_chakras, report.advice):
         score_100 = converted_scores[chakra]
-        advice_data = get_advice_dynamic(chakra, score_100)
         
         if advice_data:
             with st.expander(f"{chakra} (能量指數: {score_100:.0f})"):
@@ -431,45 +649,23 @@ elif st.session_state.step == "result":
             with st.expander(f"{chakra} (能量指數: {score_100:.0f})"):
                 st.write("暫無詳細分析資料")
 
+    # AI 解讀先佔位，等整份報告畫完才在最後串流填入，不擋住下方的推薦與按鈕
+    narrative_service = get_narrative_service()
+    narrative_slot = st.container() if narrative_service is not None else None
+
     st.divider()
     st.subheader("💎 您的能量校準方案")
     st.markdown("<p style='color:#d4af37; font-weight:bold;'>偵測到您的能量場存在連鎖影響，建議優先調整以下三個核心脈輪：</p>", unsafe_allow_html=True)
 
-    # 1. 計算「百分比偏移」失衡權重 (解決 10 分與 90 分對等嚴重程度)
-    imbalance_scores = {}
-    for k, v in converted_scores.items():
-        if v < 61:
-            # 不足區：(理想下限 61 - 實際分數) / 不足區總長度 61
-            imbalance_scores[k] = (61 - v) / 61
-        elif v > 85:
-            # 過度區：(實際分數 - 理想上限 85) / 過度區總長度 15
-            # 加入 2.5 倍敏感係數，平衡高低分區的區間差異
-            imbalance_scores[k] = ((v - 85) / 15) * 2.5
-        else:
-            imbalance_scores[k] = 0
-
-    # 2. 取得失衡度最高的前 3 名
-    top_3_targets = sorted(imbalance_scores, key=imbalance_scores.get, reverse=True)[:3]
+    # 依「百分比偏移」失衡權重 (解決 10 分與 90 分對等嚴重程度) 取前 3 名
+    top_3_targets = report.targets
 
     # 3. 建立三欄式推薦版面
     rec_cols = st.columns(3)
 
     for i, target in enumerate(top_3_targets):
         with rec_cols[i]:
-            rec_product = None
-            if df_prod is not None:
-                # 篩選對應脈輪 (取前兩個字匹配)
-                c_match = df_prod[df_prod['Chakra_Category'].astype(str).str.contains(target[:2], na=False)]
-                
-                # 優先匹配 MBTI 或 氣質
-                for _, row in c_match.iterrows():
-                    p_targets = str(row['MBTI_Match']).upper()
-                    if (user_mbti in p_targets) or (user_group in p_targets) or ("ALL" in p_targets):
-                        rec_product = row
-                        break
-                # 若無精準匹配，取該脈輪第一件備選
-                if rec_product is None and not c_match.empty:
-                    rec_product = c_match.iloc[0]
+            rec_product = report.products[i]
 
             # 顯示精緻推薦卡片
             if rec_product is not None:
@@ -504,3 +700,20 @@ elif st.session_state.step == "result":
     
     if st.button("🔄 重新測驗"):
         st.session_state.clear(); st.rerun()
+
+    if narrative_slot is not None:
+        with narrative_slot:
+            st.divider()
+            st.subheader("✨ 專屬能量解讀")
+            if "narrative" in st.session_state:
+                st.write(st.session_state.narrative)
+            else:
+                try:
+                    with metrics.timer("narrative.stream"):
+                        st.session_state.narrative = st.write_stream(narrative_service.stream(report))
+                except Exception:
+                    logger.exception("AI 解讀生成失敗")
+                    metrics.incr("narrative.errors")
+                    st.caption("解讀生成暫時無法使用，請稍後再試。")
+
+metrics.observe(f"step.{current_step}", time.perf_counter() - step_started)
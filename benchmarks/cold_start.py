@@ -0,0 +1,70 @@
+"""冷啟動量測：每次開一個全新的 Python 行程，以 AppTest 跑第一次歡迎頁。
+
+    python -m benchmarks.cold_start --runs 5
+
+回報第一次執行 (first paint) 與第二次 rerun 的耗時，以及歡迎頁畫完時已被載入的重量級模組。
+AppTest 本身會匯入 plotly 核心，因此以 plotly.express 判斷結果頁的圖表是否被提前載入。
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+
+from benchmarks.fixtures import write_sheets
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+HEAVY_MODULES = ("plotly.express", "gspread", "streamlit_gsheets", "pandas")
+
+_CHILD = """
+import json, os, sys, time
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file(sys.argv[1], default_timeout=60)
+for key, value in json.loads(sys.argv[2]).items():
+    at.secrets[key] = value
+start = time.perf_counter(); at.run(); first = time.perf_counter() - start
+loaded = {m: m in sys.modules for m in json.loads(sys.argv[3])}
+start = time.perf_counter(); at.run(); rerun = time.perf_counter() - start
+print(json.dumps({"first_paint": first, "rerun": rerun, "loaded": loaded, "error": bool(at.exception)}))
+"""
+
+
+def measure(runs=5):
+    workdir = tempfile.mkdtemp(prefix="furealm-cold-")
+    secrets = json.dumps(write_sheets(workdir))
+    results = []
+    for _ in range(runs):
+        # 每次用新的資料目錄，連本機快照也不存在，才是真正的冷啟動
+        env = {**os.environ, "FUREALM_DATA_DIR": tempfile.mkdtemp(dir=workdir)}
+        out = subprocess.run(
+            [sys.executable, "-c", _CHILD, APP, secrets, json.dumps(HEAVY_MODULES)],
+            capture_output=True, text=True, env=env, check=True,
+        )
+        results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fù Realm 冷啟動 / 第一個畫面耗時")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    results = measure(args.runs)
+    first = np.array([r["first_paint"] for r in results]) * 1000
+    rerun = np.array([r["rerun"] for r in results]) * 1000
+    print(f"first paint：中位數 {np.median(first):.0f} ms (最小 {first.min():.0f} / 最大 {first.max():.0f})")
+    print(f"第二次 rerun：中位數 {np.median(rerun):.0f} ms")
+    for module in HEAVY_MODULES:
+        hits = sum(r["loaded"][module] for r in results)
+        print(f"歡迎頁畫完時已載入 {module}：{hits}/{len(results)}")
+    if any(r["error"] for r in results):
+        print("歡迎頁執行出現例外", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+"""GSheetsConnection 的記憶體替身，壓測時取代 streamlit_gsheets.GSheetsConnection。
+
+只實作 app.py 用到的部分：conn.client._select_worksheet(...).append_rows / batch_get / row_values / update 與 conn.read。
+所有 session 共用同一份 WORKBOOK，壓測結束後可據此核對寫入筆數。
+"""
+import threading
+import time
+
+import pandas as pd
+from streamlit.connections import BaseConnection
+
+from furealm.result_logger import RESULT_COLUMNS
+
+
+class FakeWorksheet:
+    def __init__(self, header, latency=0.0):
+        self.header = list(header)
+        self.rows = []
+        self.latency = latency  # 模擬 API 往返時間 (秒)
+        self.append_calls = 0
+        self._lock = threading.Lock()
+
+    def append_rows(self, rows, value_input_option=None):
+        time.sleep(self.latency)
+        with self._lock:
+            self.rows.extend(list(r) for r in rows)
+            self.append_calls += 1
+
+    def row_values(self, row):
+        time.sleep(self.latency)
+        return list(self.header) if row == 1 else list(self.rows[row - 2])
+
+    def update(self, range_name, values=None):
+        # 只支援 app.py 用到的表頭補欄 ("E1" 之類的單列範圍)
+        time.sleep(self.latency)
+        start = ord(range_name[0]) - ord("A")
+        with self._lock:
+            self.header[start:start + len(values[0])] = values[0]
+
+    def batch_get(self, ranges):
+        # 只支援 app.py 用到的 "1:1" 與 "A{n}:Z" 兩種範圍
+        time.sleep(self.latency)
+        with self._lock:
+            rows = list(self.rows)
+        out = []
+        for rng in ranges:
+            if rng == "1:1":
+                out.append([self.header])
+            else:
+                start = int(rng.split(":")[0][1:]) - 2
+                out.append(rows[start:])
+        return out
+
+
+class FakeClient:
+    def __init__(self, workbook):
+        self.workbook = workbook
+
+    def _select_worksheet(self, worksheet=None, **kwargs):
+        return self.workbook[worksheet]
+
+
+WORKBOOK = {"QuizResults": FakeWorksheet(RESULT_COLUMNS)}
+
+
+class FakeGSheetsConnection(BaseConnection):
+    def _connect(self, **kwargs):
+        return FakeClient(WORKBOOK)
+
+    @property
+    def client(self):
+        return self._instance
+
+    def read(self, worksheet=None, ttl=None, **kwargs):
+        sheet = WORKBOOK[worksheet]
+        return pd.DataFrame(list(sheet.rows), columns=sheet.header)
+
+
+def reset(latency=0.0):
+    WORKBOOK["QuizResults"] = FakeWorksheet(RESULT_COLUMNS, latency=latency)
+    return WORKBOOK["QuizResults"]
+
+
+def install():
+    # 必須在 AppTest 執行 app.py 之前呼叫；app.py 以 from ... import 取得的會是替身
+    import streamlit_gsheets
+    streamlit_gsheets.GSheetsConnection = FakeGSheetsConnection
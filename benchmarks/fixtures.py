@@ -0,0 +1,63 @@
+"""離線壓測 / 基準測試用的四張內容表替身 (欄名與正式試算表相同，經 normalize_columns 後可直接使用)。"""
+import os
+import random
+
+import pandas as pd
+
+from furealm import CHAKRA_ORDER, MBTI_GROUPS
+from furealm.scoring import MBTI_DIMS
+
+LOGIC_BANDS = (("0-40", "不足", "卡住", "補能"), ("41~85", "平衡", "", "保持"), ("86 - 100", "過度", "過熱", "收斂"))
+
+
+def mbti_sheet(per_dim=15):
+    rows = [(f"{dim} 問題 {i}", dim, f"A{i}", f"B{i}") for dim in MBTI_DIMS for i in range(per_dim)]
+    return pd.DataFrame(rows, columns=["題目", "維度", "Option_A", "Option_B"])
+
+
+def chakra_sheet(per_chakra=10):
+    rows = [(f"{chakra} 題 {i}", chakra) for chakra in CHAKRA_ORDER for i in range(per_chakra)]
+    return pd.DataFrame(rows, columns=["Question", "Chakra_Category"])
+
+
+def logic_sheet(extra_rules=0, seed=0):
+    # 每個脈輪三段基本區間；extra_rules 額外加上隨機的重疊區間 (先出現者優先，不影響基本區間的命中)
+    rows = [(chakra, rng, status, trigger, f"{chakra} {copy}") for chakra in CHAKRA_ORDER for rng, status, trigger, copy in LOGIC_BANDS]
+    rand = random.Random(seed)
+    for i in range(extra_rules):
+        lo = rand.randint(0, 99)
+        rows.append((rand.choice(CHAKRA_ORDER), f"{lo}-{rand.randint(lo, 100)}", f"狀態{i}", "", f"文案 {i}"))
+    return pd.DataFrame(rows, columns=["Chakra_Category", "Score_Range", "Status", "Trigger", "Action_Copy"])
+
+
+def product_sheet(extra_products=0, seed=0):
+    rows = []
+    for chakra in CHAKRA_ORDER:
+        rows += [
+            (f"{chakra}-1", f"{chakra} 通用", chakra, "白水晶", "ALL"),
+            (f"{chakra}-2", f"{chakra} NF", chakra, "紫水晶", "NF"),
+            (f"{chakra}-3", f"{chakra} INFJ", chakra, "月光石", "INFJ"),
+        ]
+    rand = random.Random(seed)
+    matches = list(MBTI_GROUPS) + sorted(set(MBTI_GROUPS.values())) + ["ALL"]
+    for i in range(extra_products):
+        chakra = rand.choice(CHAKRA_ORDER)
+        rows.append((f"P{i}", f"{chakra} 商品 {i}", chakra, "晶石", rand.choice(matches)))
+    return pd.DataFrame(rows, columns=["Product_ID", "名稱", "Chakra_Category", "晶石", "MBTI_Match"])
+
+
+def write_sheets(directory, mbti_per_dim=15, chakra_per_cat=10, extra_rules=0, extra_products=0):
+    # 寫成 CSV 並回傳可直接放進 st.secrets 的 {"MBTI_CSV_URL": path, ...}
+    os.makedirs(directory, exist_ok=True)
+    sheets = {
+        "MBTI": mbti_sheet(mbti_per_dim),
+        "CHAKRA": chakra_sheet(chakra_per_cat),
+        "LOGIC": logic_sheet(extra_rules),
+        "PRODUCT": product_sheet(extra_products),
+    }
+    secrets = {}
+    for name, df in sheets.items():
+        path = os.path.join(directory, f"{name.lower()}.csv")
+        df.to_csv(path, index=False, encoding="utf-8-sig")
+        secrets[f"{name}_CSV_URL"] = path
+    return secrets
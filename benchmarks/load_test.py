@@ -0,0 +1,315 @@
+"""離線多 session 壓測：以 Streamlit AppTest 無頭驅動 app.py。
+
+四張內容表改用本機 CSV 替身、GSheetsConnection 改用記憶體替身，不需要網路：
+
+    python -m benchmarks.load_test --users 24 --concurrency 8
+    python -m benchmarks.load_test --users 60 --concurrency 12 --budget result=150 --json load.json
+
+每位虛擬用戶依序輪流走 已知型 / 探索型 / 深層型 x 快速 / 深度 六條路徑，
+報告各頁面單次執行的耗時分布、每份完成測驗的 rerun 次數、RSS 與 QuizResults 遺失筆數。
+所有 session 在同一個行程內執行，共用 cache_resource 與背景執行緒 (與正式伺服器相同)。
+AppTest 的 runtime 是行程全域的，無法真的同時執行兩個 script run，因此各 session 的
+執行緒輪流取得 _RUN_LOCK：表中 p50~max 為單次 rerun 本身的耗時，「排隊 p95」另含等待
+其他 session 的時間，相當於伺服器在 GIL 下同時處理 N 個 session 時用戶感受到的回應時間。
+RSS 為整個行程的數字，每 session 的增量以 (峰值 - 暖機後基準) / 用戶數估算。
+因為 script run 被 _RUN_LOCK 序列化，上面的 QuizResults 核對並沒有真的並行寫入；
+另外以 --logger-threads 個執行緒直接對 ResultLogger 並行 enqueue / flush (寫到替身工作表，
+可注入暫時性失敗)，核對每一筆是否剛好寫入一次。
+有例外、遺失 / 重複筆數或超出 --budget 時以非零狀態碼結束，可作為活動前的效能閘門。
+"""
+import os
+import tempfile
+
+# 必須在匯入 furealm 之前設定，journal / 快照才會寫到這次壓測專用的目錄
+WORKDIR = tempfile.mkdtemp(prefix="furealm-load-")
+os.environ.setdefault("FUREALM_DATA_DIR", os.path.join(WORKDIR, "data"))
+
+import argparse
+import json
+import logging
+import random
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from streamlit.testing.v1 import AppTest
+
+from benchmarks import fake_gsheets
+from benchmarks.fixtures import write_sheets
+from furealm.result_logger import RESULT_COLUMNS, ResultLogger
+from furealm.scoring import ANSWER_A, ANSWER_B
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+PATHS = [(mbti, chakra) for mbti in ("known", "explore", "deep") for chakra in ("Quick", "Deep")]
+MBTI_BUTTONS = {"known": "🚀 已知型", "explore": "🔍 探索型", "deep": "💎 深層型"}
+CHAKRA_BUTTONS = {"Quick": "⚡ 快速檢測", "Deep": "🔮 深度檢測"}
+_RUN_LOCK = threading.Lock()
+
+
+def read_rss():
+    # (目前 RSS, 峰值 RSS)，單位 MB
+    values = {}
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(("VmRSS:", "VmHWM:")):
+                key, kb = line.split()[:2]
+                values[key] = int(kb) / 1024
+    return values.get("VmRSS:", 0.0), values.get("VmHWM:", 0.0)
+
+
+class SessionError(RuntimeError):
+    pass
+
+
+class VirtualUser:
+    def __init__(self, uid, path, secrets, timeout):
+        self.uid = uid
+        self.mbti_path, self.chakra_mode = path
+        self.rand = random.Random(uid)
+        self.timings = []  # [(step, rerun 秒數, 含排隊秒數)]
+        self.reruns = 0
+        self.at = AppTest.from_file(APP, default_timeout=timeout)
+        for key, value in secrets.items():
+            self.at.secrets[key] = value
+
+    @property
+    def step(self):
+        return self.at.session_state.step if "step" in self.at.session_state else "start"
+
+    def _act(self, action):
+        queued = time.perf_counter()
+        with _RUN_LOCK:
+            step = self.step
+            start = time.perf_counter()
+            action()
+            end = time.perf_counter()
+        self.timings.append((step, end - start, end - queued))
+        self.reruns += 1
+        if self.at.exception:
+            raise SessionError(f"{step}: {self.at.exception[0].message}")
+
+    def _button(self, label):
+        for b in self.at.button:
+            if b.label == label:
+                return b
+        raise SessionError(f"{self.step}: 找不到按鈕 {label}")
+
+    def click(self, label):
+        self._act(lambda: self._button(label).click().run())
+
+    def _answer_mbti_page(self):
+        pair = [b for b in self.at.button if b.key and b.key.startswith(("ma", "mb"))]
+        if pair:
+            choice = self.rand.choice(pair)
+            return self._act(lambda: choice.click().run())
+        for radio in self.at.radio:
+            radio.set_value(self.rand.choice((ANSWER_A, ANSWER_B)))
+        self.click("下一頁")
+
+    def _answer_chakra_page(self):
+        for slider in self.at.slider:
+            slider.set_value(self.rand.randint(1, 5))
+        label = next(b.label for b in self.at.button if b.label in ("下一題", "下一頁"))
+        self.click(label)
+
+    def run(self):
+        self._act(self.at.run)
+        self.click(MBTI_BUTTONS[self.mbti_path])
+        if self.mbti_path == "known":
+            self.at.selectbox[0].set_value(self.rand.choice(self.at.selectbox[0].options))
+            self.click("下一步")
+        while self.step == "mbti_quiz":
+            self._answer_mbti_page()
+        self.click(CHAKRA_BUTTONS[self.chakra_mode])
+        while self.step == "chakra_quiz":
+            self._answer_chakra_page()
+        if self.step != "result":
+            raise SessionError(f"測驗未完成，停在 {self.step}")
+        # 結果頁的第二次 rerun (例如展開解析) 應只剩渲染
+        self._act(self.at.run)
+        return self
+
+
+def percentiles(values):
+    arr = np.asarray(values, dtype=float) * 1000
+    return {"n": len(arr), "p50": float(np.percentile(arr, 50)), "p95": float(np.percentile(arr, 95)),
+            "p99": float(np.percentile(arr, 99)), "max": float(arr.max())}
+
+
+def run_load(users=24, concurrency=8, timeout=60, page_size=5, adaptive=True, sheet_latency=0.0, drain_timeout=30, narrative=False):
+    secrets = write_sheets(os.path.join(WORKDIR, "sheets"))
+    secrets.update({"QUIZ_PAGE_SIZE": page_size, "ADAPTIVE_QUIZ": adaptive})
+    if narrative:
+        secrets["NARRATIVE_MODE"] = "stub"
+    fake_gsheets.install()
+    sheet = fake_gsheets.reset(latency=sheet_latency)
+
+    # 暖機：第一個 session 負責載入內容表 / 建立 cache_resource，不列入統計
+    warmup = VirtualUser(-1, PATHS[0], secrets, timeout).run()
+    rss_base, _ = read_rss()
+
+    completed, errors = [warmup], []
+
+    def one(uid):
+        try:
+            return VirtualUser(uid, PATHS[uid % len(PATHS)], secrets, timeout).run()
+        except Exception as e:
+            errors.append(f"user {uid}: {e!r}")
+            return None
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        finished = [u for u in pool.map(one, range(users)) if u is not None]
+    wall = time.perf_counter() - started
+    completed += finished
+    rss_now, rss_peak = read_rss()
+
+    # 等 ResultLogger 把佇列寫完，再核對 QuizResults 筆數
+    deadline = time.time() + drain_timeout
+    while len(sheet.rows) < len(completed) and time.time() < deadline:
+        time.sleep(0.2)
+
+    by_step, response = defaultdict(list), defaultdict(list)
+    reruns = defaultdict(list)
+    for u in finished:
+        for step, seconds, waited in u.timings:
+            by_step[step].append(seconds)
+            response[step].append(waited)
+        reruns[f"{u.mbti_path}/{u.chakra_mode}"].append(u.reruns)
+
+    return {
+        "users": users, "concurrency": concurrency, "completed": len(finished), "errors": errors,
+        "wall_seconds": wall, "quizzes_per_second": len(finished) / wall if wall else 0.0,
+        "steps_ms": {step: percentiles(v) for step, v in sorted(by_step.items())},
+        "response_ms": {step: percentiles(v) for step, v in sorted(response.items())},
+        "reruns_per_quiz": {path: float(np.mean(v)) for path, v in sorted(reruns.items())},
+        "rss_mb": {"baseline": rss_base, "end": rss_now, "peak": rss_peak,
+                   "per_session": max(rss_peak - rss_base, 0.0) / max(users, 1)},
+        "quiz_results": {"expected": len(completed), "written": len(sheet.rows),
+                         "lost": max(len(completed) - len(sheet.rows), 0),
+                         "duplicated": max(len(sheet.rows) - len(completed), 0),
+                         "append_calls": sheet.append_calls},
+    }
+
+
+def stress_result_logger(threads=8, rows_per_thread=200, batch_size=20, flush_interval=0.05, fail_rate=0.1,
+                         latency=0.0, drain_timeout=30):
+    """多執行緒直接 enqueue / flush 同一個 ResultLogger，核對替身工作表上每一筆是否剛好一次。"""
+    sheet = fake_gsheets.FakeWorksheet(RESULT_COLUMNS, latency=latency)
+    rand = random.Random(0)
+    failures = [0]
+
+    def append_rows(rows):
+        # 在寫入前失敗 (如 429)，資料應留在 journal 待重試
+        if rand.random() < fail_rate:
+            failures[0] += 1
+            raise ConnectionError("injected")
+        sheet.append_rows(rows)
+
+    journal = os.path.join(tempfile.mkdtemp(dir=WORKDIR), "stress.journal")
+    result_logger = ResultLogger(append_rows, journal, batch_size=batch_size, flush_interval=flush_interval)
+
+    def producer(t):
+        for i in range(rows_per_thread):
+            result_logger.enqueue([f"stress-{t}-{i}"] + [""] * (len(RESULT_COLUMNS) - 1))
+            if i % 25 == 0:
+                result_logger.flush()  # 與背景 worker 搶著 flush
+
+    # 注入的失敗是預期內的，不必每次印出 traceback
+    log = logging.getLogger("furealm.result_logger")
+    log.disabled = True
+    try:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            list(pool.map(producer, range(threads)))
+        deadline = time.time() + drain_timeout
+        while result_logger.pending_count() and time.time() < deadline:
+            result_logger.flush()
+            time.sleep(0.01)
+        wall = time.perf_counter() - started
+    finally:
+        log.disabled = False
+
+    written = Counter(row[0] for row in sheet.rows)
+    expected = {f"stress-{t}-{i}" for t in range(threads) for i in range(rows_per_thread)}
+    return {"threads": threads, "expected": len(expected), "written": len(sheet.rows),
+            "lost": len(expected - set(written)), "duplicated": sum(n - 1 for n in written.values() if n > 1),
+            "append_calls": sheet.append_calls, "injected_failures": failures[0], "wall_seconds": wall}
+
+
+def format_report(report):
+    lines = [f"{report['completed']}/{report['users']} 份測驗完成 (並行 {report['concurrency']})，"
+             f"{report['wall_seconds']:.1f}s，{report['quizzes_per_second']:.2f} 份/秒"]
+    lines.append(f"{'頁面':<12}{'n':>6}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}{'排隊p95':>9}  (ms)")
+    for step, s in report["steps_ms"].items():
+        r = report["response_ms"][step]
+        lines.append(f"{step:<12}{s['n']:>6}{s['p50']:>9.1f}{s['p95']:>9.1f}{s['p99']:>9.1f}{s['max']:>9.1f}{r['p95']:>9.1f}")
+    lines.append("每份測驗 rerun 次數：" + "，".join(f"{k} {v:.1f}" for k, v in report["reruns_per_quiz"].items()))
+    rss = report["rss_mb"]
+    lines.append(f"RSS：基準 {rss['baseline']:.0f} MB / 峰值 {rss['peak']:.0f} MB / 每 session 約 {rss['per_session']:.2f} MB")
+    qr = report["quiz_results"]
+    lines.append(f"QuizResults：應寫入 {qr['expected']} / 實際 {qr['written']} / 遺失 {qr['lost']} / 重複 {qr['duplicated']} (append {qr['append_calls']} 次)")
+    ls = report.get("logger_stress")
+    if ls:
+        lines.append(f"ResultLogger 並行寫入：{ls['threads']} 執行緒 應寫入 {ls['expected']} / 實際 {ls['written']} / "
+                     f"遺失 {ls['lost']} / 重複 {ls['duplicated']} (append {ls['append_calls']} 次，注入失敗 {ls['injected_failures']} 次，"
+                     f"{ls['wall_seconds']:.1f}s)")
+    for e in report["errors"]:
+        lines.append(f"錯誤 {e}")
+    return "\n".join(lines)
+
+
+def check_budgets(report, budgets):
+    # budgets: {"result": 150, ...} 為各頁面 p95 上限 (ms)
+    failures = [e for e in report["errors"]]
+    if report["quiz_results"]["lost"]:
+        failures.append(f"QuizResults 遺失 {report['quiz_results']['lost']} 筆")
+    ls = report.get("logger_stress")
+    if ls and (ls["lost"] or ls["duplicated"]):
+        failures.append(f"ResultLogger 並行寫入遺失 {ls['lost']} 筆 / 重複 {ls['duplicated']} 筆")
+    for step, limit in budgets.items():
+        p95 = report["steps_ms"].get(step, {}).get("p95")
+        if p95 is not None and p95 > limit:
+            failures.append(f"{step} p95 {p95:.1f}ms > {limit}ms")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fù Realm 離線多 session 壓測")
+    parser.add_argument("--users", type=int, default=24)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--page-size", type=int, default=5, help="QUIZ_PAGE_SIZE")
+    parser.add_argument("--no-adaptive", action="store_true", help="關閉自適應出題 (每題都作答)")
+    parser.add_argument("--sheet-latency", type=float, default=0.0, help="模擬 Sheets API 往返秒數")
+    parser.add_argument("--narrative", action="store_true", help="結果頁啟用 AI 解讀 (本機 stub 模型)")
+    parser.add_argument("--timeout", type=float, default=60, help="單次 rerun 逾時秒數")
+    parser.add_argument("--budget", action="append", default=[], metavar="STEP=MS", help="頁面 p95 上限，可重複指定")
+    parser.add_argument("--logger-threads", type=int, help="ResultLogger 並行寫入的執行緒數 (預設同 --concurrency，0 為不測)")
+    parser.add_argument("--logger-rows", type=int, default=200, help="每個執行緒寫入筆數")
+    parser.add_argument("--logger-fail-rate", type=float, default=0.1, help="注入 append 失敗的機率")
+    parser.add_argument("--json", help="另存完整報告 JSON")
+    args = parser.parse_args(argv)
+
+    budgets = {k: float(v) for k, v in (b.split("=", 1) for b in args.budget)}
+    report = run_load(args.users, args.concurrency, args.timeout, args.page_size, not args.no_adaptive, args.sheet_latency,
+                      narrative=args.narrative)
+    logger_threads = args.concurrency if args.logger_threads is None else args.logger_threads
+    if logger_threads:
+        report["logger_stress"] = stress_result_logger(logger_threads, args.logger_rows, fail_rate=args.logger_fail_rate,
+                                                       latency=args.sheet_latency)
+    print(format_report(report))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    failures = check_budgets(report, budgets)
+    for failure in failures:
+        print(f"FAIL {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+"""優化前 app.py 內的原始寫法 (pandas 逐列版本)，作為等價性檢查與加速比的對照組。
+
+商品推薦依 user-002 明訂的分層規則 (MBTI 完全符合 > 氣質群組 > ALL > 第一件備選) 以原本的
+str.contains + iterrows 寫法重現；其餘皆與原始程式相同。
+"""
+import io
+import random
+import re
+
+import pandas as pd
+
+from furealm import CHAKRA_ORDER
+
+
+def load_csv(raw):
+    try: df = pd.read_csv(io.BytesIO(raw), encoding='utf-8')
+    except: df = pd.read_csv(io.BytesIO(raw), encoding='utf-8-sig')
+
+    df.columns = df.columns.str.strip()
+
+    rename_map = {}
+    for col in df.columns:
+        c = col.lower().replace("_", "").replace(" ", "").replace("(", "").replace(")", "")
+
+        if any(x in c for x in ["題目", "問題", "question", "content"]): rename_map[col] = "Question"
+        elif any(x in c for x in ["模式", "type", "mode"]): rename_map[col] = "Mode"
+        elif any(x in c for x in ["維度", "dim"]): rename_map[col] = "Dimension"
+        elif "optiona" in c or "選項a" in c: rename_map[col] = "Option_A"
+        elif "optionb" in c or "選項b" in c: rename_map[col] = "Option_B"
+        elif any(x in c for x in ["分類", "脈輪", "category", "chakra", "focus"]): rename_map[col] = "Chakra_Category"
+
+        elif "range" in c or "區間" in c: rename_map[col] = "Score_Range"
+        elif "status" in c or "狀態" in c or "label" in c: rename_map[col] = "Status"
+        elif "trigger" in c or "觸發" in c: rename_map[col] = "Trigger"
+        elif "copy" in c or "文案" in c or "action" in c: rename_map[col] = "Action_Copy"
+        elif "mapping" in c or "索引" in c or "logic" in c: rename_map[col] = "Product_Mapping"
+
+        elif "product" in c or "商品" in c or "id" in c: rename_map[col] = "Product_ID"
+        elif "name" in c or "名稱" in c: rename_map[col] = "Product_Name"
+        elif "gem" in c or "晶石" in c or "stone" in c: rename_map[col] = "Gemstones"
+        elif "link" in c or "連結" in c or "url" in c: rename_map[col] = "Store_Link"
+        elif "match" in c or "mbti" in c: rename_map[col] = "MBTI_Match"
+        elif "desc" in c or "說明" in c or "描述" in c: rename_map[col] = "Description"
+
+    df.rename(columns=rename_map, inplace=True)
+    return df
+
+
+def draw_questions(df, type_col, categories, count_per_cat):
+    selected_indices = []
+    for cat in categories:
+        subset = df[df[type_col] == cat]
+        if not subset.empty:
+            n = min(len(subset), count_per_cat)
+            selected = subset.sample(n=n)
+            selected_indices.extend(selected.index.tolist())
+    random.shuffle(selected_indices)
+    return df.loc[selected_indices].reset_index(drop=True)
+
+
+def score_mbti(mbti_answers):
+    # mbti_answers: [{'dim': 'E / I', 'score': 'A'}, ...]
+    res_df = pd.DataFrame(mbti_answers)
+    final_mbti = ""
+    if not res_df.empty and 'dim' in res_df.columns:
+        for d in ['E / I', 'S / N', 'T / F', 'J / P']:
+            sub = res_df[res_df['dim'] == d]
+            a_count = (sub['score'] == 'A').sum(); b_count = (sub['score'] == 'B').sum()
+            final_mbti += d[0] if a_count >= b_count else d[4]
+    return final_mbti
+
+
+def score_chakras(chakra_answers):
+    # chakra_answers: {idx: {'cat': 脈輪, 'val': 1-5}}
+    res_df = pd.DataFrame(chakra_answers).T
+    return res_df.groupby('cat')['val'].mean().to_dict()
+
+
+def get_advice_dynamic(df_logic, chakra, score):
+    if df_logic is None or df_logic.empty: return None
+
+    rules = df_logic[df_logic['Chakra_Category'].astype(str).str.contains(chakra[:2], na=False)]
+
+    for _, row in rules.iterrows():
+        try:
+            range_str = str(row['Score_Range']).strip()
+            matches = re.findall(r'\d+', range_str)
+
+            if len(matches) >= 2:
+                min_v = int(matches[0])
+                max_v = int(matches[1])
+
+                if min_v <= score <= max_v:
+                    return {
+                        "status": row.get('Status', 'Status'),
+                        "trigger": row.get('Trigger', ''),
+                        "copy": row.get('Action_Copy', '暫無建議')
+                    }
+        except Exception as e:
+            continue
+    return None
+
+
+def converted_scores(scores):
+    final_scores = {k: scores.get(k, 0) for k in CHAKRA_ORDER}
+    return {k: (v - 1) * 25 for k, v in final_scores.items()}
+
+
+def top_3_targets(converted):
+    imbalance_scores = {}
+    for k, v in converted.items():
+        if v < 61:
+            imbalance_scores[k] = (61 - v) / 61
+        elif v > 85:
+            imbalance_scores[k] = ((v - 85) / 15) * 2.5
+        else:
+            imbalance_scores[k] = 0
+    return sorted(imbalance_scores, key=imbalance_scores.get, reverse=True)[:3]
+
+
+def recommend_product(df_prod, target, user_mbti, user_group):
+    c_match = df_prod[df_prod['Chakra_Category'].astype(str).str.contains(target[:2], na=False)]
+    for key in [t for t in (user_mbti, user_group) if t] + ["ALL"]:
+        for _, row in c_match.iterrows():
+            if key in str(row['MBTI_Match']).upper():
+                return row
+    if not c_match.empty:
+        return c_match.iloc[0]
+    return None
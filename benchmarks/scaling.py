@@ -0,0 +1,277 @@
+"""核心演算法的微基準與規模測試 (合成內容表，數百列到 10 萬列以上)。
+
+    python -m benchmarks.scaling                      # 與 benchmarks/baseline.json 比較
+    python -m benchmarks.scaling --sizes 300 3000     # 只跑較小的規模
+    python -m benchmarks.scaling --update-baseline    # 重新記錄基準 (連同程式變更一起 commit)
+
+每個項目同時檢查與優化前寫法 (benchmarks/reference.py) 的結果是否一致；
+對照組的耗時在 --reference-max 列以下一併量測，用來看加速比。
+任何項目不一致，或耗時超過基準 --tolerance 倍時，以非零狀態碼結束。
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+from collections import Counter
+
+import numpy as np
+
+from benchmarks import reference
+from benchmarks.fixtures import chakra_sheet, logic_sheet, mbti_sheet, product_sheet
+from furealm import CHAKRA_ORDER, MBTI_GROUPS
+from furealm.answers import AnswerSheet
+from furealm.logic_index import compile_logic_rules, get_advice
+from furealm.products import build_product_table, recommend_product
+from furealm.question_bank import QuestionBank
+from furealm.scoring import (ANSWER_A, ANSWER_B, CHAKRA_CODES, DIM_CODES, MBTI_DIMS, convert_scores, score_batch,
+                             score_chakras, score_mbti)
+from furealm.sheet_cache import normalize_columns, parse_csv
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+DEFAULT_SIZES = (300, 3_000, 30_000, 120_000)
+
+
+def timeit(fn, min_time=0.2, max_repeat=50):
+    # 重複執行直到累計 min_time 秒 (至少 3 次)，回傳中位數毫秒
+    samples, total = [], 0.0
+    while len(samples) < 3 or (total < min_time and len(samples) < max_repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        samples.append(elapsed)
+        total += elapsed
+    return float(np.median(samples)) * 1000
+
+
+def _csv_bytes(df):
+    return df.to_csv(index=False).encode("utf-8-sig")
+
+
+def _sample(values, limit, seed=0):
+    values = list(values)
+    return values if len(values) <= limit else random.Random(seed).sample(values, limit)
+
+
+# --- 各基準項目：setup(n) 回傳 (新寫法, 對照組, 等價檢查) ---
+
+def bench_parse(n):
+    raw = _csv_bytes(mbti_sheet(max(n // len(MBTI_DIMS), 1)))
+    new = lambda: parse_csv(raw)
+    ref = lambda: reference.load_csv(raw)
+    check = lambda: new().equals(ref())
+    return new, ref, check
+
+
+def bench_draw(n):
+    df = normalize_columns(chakra_sheet(max(n // len(CHAKRA_ORDER), 1)))
+    bank = QuestionBank(df, "Chakra_Category")
+    new = lambda: bank.draw(CHAKRA_ORDER, 8)
+    ref = lambda: reference.draw_questions(df, "Chakra_Category", CHAKRA_ORDER, 8)
+
+    def check():
+        # 抽題為隨機，比較兩邊各分類的題數與題目是否屬於該分類、不重複
+        ids = new()
+        ref_df = ref()
+        same_counts = Counter(bank.row(q)["Chakra_Category"] for q in ids) == Counter(ref_df["Chakra_Category"])
+        return same_counts and len(set(ids.tolist())) == len(ids) and not ref_df["Question"].duplicated().any()
+    return new, ref, check
+
+
+def bench_score_mbti(n):
+    rand = random.Random(n)
+    answers = [(rand.choice(MBTI_DIMS), rand.choice("AB")) for _ in range(n)]
+    sheet = AnswerSheet(n)
+    for i, (dim, pick) in enumerate(answers):
+        sheet.record(i, DIM_CODES[dim], ANSWER_A if pick == "A" else ANSWER_B)
+    ref_answers = [{"dim": d, "score": s} for d, s in answers]
+    new = lambda: score_mbti(sheet)
+    ref = lambda: reference.score_mbti(ref_answers)
+    check = lambda: new() == ref()
+    return new, ref, check
+
+
+def bench_score_chakras(n):
+    rand = random.Random(n)
+    answers = [(rand.choice(CHAKRA_ORDER), rand.randint(1, 5)) for _ in range(n)]
+    sheet = AnswerSheet(n)
+    for i, (chakra, val) in enumerate(answers):
+        sheet.record(i, CHAKRA_CODES[chakra], val)
+    ref_answers = {i: {"cat": c, "val": v} for i, (c, v) in enumerate(answers)}
+    new = lambda: score_chakras(sheet)
+    ref = lambda: reference.score_chakras(ref_answers)
+
+    def check():
+        a, b = new(), ref()
+        return a.keys() == b.keys() and all(abs(a[k] - b[k]) < 1e-9 for k in a)
+    return new, ref, check
+
+
+def bench_advice(n):
+    # 一份報告的 7 次查詢 (新寫法含每個內容版本一次的編譯成本另列於 logic_compile)
+    df = normalize_columns(logic_sheet(max(n - 21, 0)))
+    index = compile_logic_rules(df)
+    scores = dict(zip(CHAKRA_ORDER, (0, 12.5, 37.5, 50, 62.5, 87.5, 100)))
+    new = lambda: [get_advice(index, c, s) for c, s in scores.items()]
+    ref = lambda: [reference.get_advice_dynamic(df, c, s) for c, s in scores.items()]
+
+    def check():
+        # 小表逐分數全查，大表抽樣 (對照組每次查詢都是整表掃描)
+        points = [(c, s) for c in CHAKRA_ORDER for s in range(-25, 101)]
+        for chakra, score in _sample(points, 900 if n <= 3_000 else 60):
+            if get_advice(index, chakra, score) != reference.get_advice_dynamic(df, chakra, score):
+                return False
+        return True
+    return new, ref, check
+
+
+def bench_logic_compile(n):
+    df = normalize_columns(logic_sheet(max(n - 21, 0)))
+    return (lambda: compile_logic_rules(df)), None, None
+
+
+def bench_rank_batch(n):
+    # n 位用戶的能量指數換算 + 失衡排序 (批次重算 / 報告的共同核心)
+    rand = np.random.default_rng(n)
+    means = rand.integers(4, 21, size=(n, len(CHAKRA_ORDER))) / 4  # 1-5 分，間隔 0.25
+    mbtis = list(rand.choice(list(MBTI_GROUPS), size=n))
+    new = lambda: score_batch(means, mbtis)
+    res = [dict(zip(CHAKRA_ORDER, row)) for row in means.tolist()]
+    ref = lambda: [reference.top_3_targets(reference.converted_scores(r)) for r in res]
+
+    def check():
+        batch = new()
+        expected = ref()
+        if any(batch.target_names(i) != expected[i] for i in range(n)):
+            return False
+        return np.allclose(batch.converted, convert_scores(means))
+    return new, ref, check
+
+
+def bench_product(n):
+    df = normalize_columns(product_sheet(max(n - 21, 0)))
+    combos = [(c, m) for c in CHAKRA_ORDER for m in MBTI_GROUPS]
+    table = build_product_table(df)
+    targets = CHAKRA_ORDER[:3]
+    new = lambda: [recommend_product(table, t, "INFJ") for t in targets]
+    ref = lambda: [reference.recommend_product(df, t, "INFJ", MBTI_GROUPS["INFJ"]) for t in targets]
+
+    def check():
+        for chakra, mbti in _sample(combos, len(combos) if n <= 3_000 else 12):
+            expected = reference.recommend_product(df, chakra, mbti, MBTI_GROUPS[mbti])
+            got = recommend_product(table, chakra, mbti)
+            if (expected is None) != (got is None):
+                return False
+            if got is not None and got["Product_ID"] != expected["Product_ID"]:
+                return False
+        return True
+    return new, ref, check
+
+
+def bench_product_table(n):
+    df = normalize_columns(product_sheet(max(n - 21, 0)))
+    return (lambda: build_product_table(df)), None, None
+
+
+def bench_question_bank(n):
+    df = normalize_columns(chakra_sheet(max(n // len(CHAKRA_ORDER), 1)))
+    return (lambda: QuestionBank(df, "Chakra_Category")), None, None
+
+
+BENCHMARKS = {
+    "parse_csv": bench_parse,
+    "question_bank_build": bench_question_bank,
+    "draw_questions": bench_draw,
+    "score_mbti": bench_score_mbti,
+    "score_chakras": bench_score_chakras,
+    "logic_compile": bench_logic_compile,
+    "advice_report": bench_advice,
+    "rank_batch": bench_rank_batch,
+    "product_table_build": bench_product_table,
+    "product_report": bench_product,
+}
+
+
+def run(sizes=DEFAULT_SIZES, names=None, reference_max=30_000, min_time=0.2):
+    results = []
+    for name in names or BENCHMARKS:
+        for n in sizes:
+            new, ref, check = BENCHMARKS[name](n)
+            row = {"name": name, "size": n, "ms": timeit(new, min_time)}
+            if ref is not None and n <= reference_max:
+                row["ref_ms"] = timeit(ref, min_time, max_repeat=5)
+            if check is not None:
+                row["equivalent"] = bool(check())
+            results.append(row)
+            print(_format_row(row), flush=True)
+    return results
+
+
+def _format_row(row, baseline_ms=None):
+    ref = f"{row['ref_ms']:>10.2f}{row['ref_ms'] / row['ms']:>8.1f}x" if "ref_ms" in row else f"{'-':>10}{'':>9}"
+    eq = {True: "OK", False: "MISMATCH", None: "-"}[row.get("equivalent")]
+    base = f"{baseline_ms:>10.2f}" if baseline_ms is not None else ""
+    return f"{row['name']:<22}{row['size']:>8}{row['ms']:>10.3f}{ref}  {eq:<8}{base}"
+
+
+def load_baseline(path=BASELINE_PATH):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_baseline(results, path=BASELINE_PATH):
+    data = {
+        "machine": f"{platform.system()} {platform.machine()} / Python {platform.python_version()} / numpy {np.__version__}",
+        "results": {f"{r['name']}@{r['size']}": round(r["ms"], 4) for r in results},
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=1, sort_keys=True)
+        f.write("\n")
+
+
+def compare(results, baseline, tolerance=2.0, min_ms=0.5):
+    # 低於 min_ms 的項目計時雜訊太大，不判定退步
+    regressions = []
+    known = (baseline or {}).get("results", {})
+    for r in results:
+        base = known.get(f"{r['name']}@{r['size']}")
+        if base is not None and r["ms"] > max(base * tolerance, min_ms):
+            regressions.append(f"{r['name']}@{r['size']} {r['ms']:.2f}ms > 基準 {base:.2f}ms x {tolerance}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fù Realm 核心演算法規模測試")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), help="只跑指定項目")
+    parser.add_argument("--reference-max", type=int, default=30_000, help="對照組只量測到這個列數")
+    parser.add_argument("--min-time", type=float, default=0.2, help="每個項目至少累計量測秒數")
+    parser.add_argument("--tolerance", type=float, default=2.0, help="超過基準幾倍視為退步")
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args(argv)
+
+    print(f"{'項目':<20}{'列數':>8}{'ms':>10}{'對照 ms':>10}{'加速':>9}  {'等價':<8}")
+    results = run(args.sizes, args.only, args.reference_max, args.min_time)
+
+    failures = [f"{r['name']}@{r['size']} 與原始寫法結果不一致" for r in results if r.get("equivalent") is False]
+    if args.update_baseline:
+        save_baseline(results)
+        print(f"已更新基準 {BASELINE_PATH}")
+    else:
+        baseline = load_baseline()
+        if baseline is None:
+            print("尚無基準，請以 --update-baseline 建立")
+        else:
+            failures += compare(results, baseline, args.tolerance)
+    for failure in failures:
+        print(f"FAIL {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
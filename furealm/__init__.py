@@ -0,0 +1,16 @@
+# Fù Realm 能量診斷的核心邏輯 (與 Streamlit 頁面分離，可單獨匯入)
+import os
+
+# 七脈輪固定順序 (雷達圖、報告、抽題共用)
+CHAKRA_ORDER = ["海底輪", "臍輪", "太陽輪", "心輪", "喉輪", "眉心輪", "頂輪"]
+
+# MBTI 四大氣質對照表
+MBTI_GROUPS = {
+    "INTJ": "NT", "INTP": "NT", "ENTJ": "NT", "ENTP": "NT",
+    "INFJ": "NF", "INFP": "NF", "ENFJ": "NF", "ENFP": "NF",
+    "ISTJ": "SJ", "ISFJ": "SJ", "ESTJ": "SJ", "ESFJ": "SJ",
+    "ISTP": "SP", "ISFP": "SP", "ESTP": "SP", "ESFP": "SP"
+}
+
+# 本機資料目錄 (journal、快照等)，可用環境變數 FUREALM_DATA_DIR 覆寫
+DATA_DIR = os.environ.get("FUREALM_DATA_DIR", ".furealm")
@@ -0,0 +1,68 @@
+"""自適應出題：結果已確定的維度 / 脈輪不再出題，直接跳到下一個未確定的分類。"""
+import numpy as np
+
+from furealm import CHAKRA_ORDER
+from furealm.answers import UNKNOWN_CATEGORY
+from furealm.scoring import ANSWER_A, ANSWER_B, MBTI_DIMS
+
+
+def question_codes(bank, qs, type_col, code_map):
+    # 抽出題目對應的分類代碼 (依出題順序)
+    return np.array([code_map.get(bank.row(q)[type_col], UNKNOWN_CATEGORY) for q in qs], dtype=np.int8)
+
+
+def remaining_counts(codes, cursor, n_cats):
+    rest = codes[cursor:]
+    return np.bincount(rest[rest >= 0], minlength=n_cats)
+
+
+def mbti_locked(codes, answers):
+    # 剩餘題數 r 全部倒向另一邊也無法翻盤時即鎖定：A >= B + r (取前字母) 或 B > A + r (取後字母)
+    cats, values = answers.answered()
+    valid = cats >= 0
+    a = np.bincount(cats[valid], weights=values[valid] == ANSWER_A, minlength=len(MBTI_DIMS))
+    b = np.bincount(cats[valid], weights=values[valid] == ANSWER_B, minlength=len(MBTI_DIMS))
+    r = remaining_counts(codes, len(answers), len(MBTI_DIMS))
+    return (a >= b + r) | (b > a + r)
+
+
+def chakra_locked(codes, answers, logic_index, z=None, min_answers=2):
+    """脈輪的最終平均分區間已完全落在 Logic 表同一個區段內時鎖定。
+
+    z 為 None 時使用確定區間 (剩餘題目全答 1 分或全答 5 分)，保證與完整作答的狀態相同；
+    給定 z 時改用信賴區間 (平均分 ± z * s * sqrt(r) / n)，題數更少但不再保證一致。
+    """
+    cats, values = answers.answered()
+    valid = cats >= 0
+    n_cats = len(CHAKRA_ORDER)
+    k = np.bincount(cats[valid], minlength=n_cats)
+    total = np.bincount(cats[valid], weights=values[valid], minlength=n_cats)
+    sq = np.bincount(cats[valid], weights=values[valid].astype(float) ** 2, minlength=n_cats)
+    r = remaining_counts(codes, len(answers), n_cats)
+    n = k + r
+
+    locked = np.zeros(n_cats, dtype=bool)
+    for j, chakra in enumerate(CHAKRA_ORDER):
+        if r[j] == 0:
+            locked[j] = True
+            continue
+        if k[j] < min_answers:
+            continue
+        lo, hi = (total[j] + r[j] * 1) / n[j], (total[j] + r[j] * 5) / n[j]
+        if z is not None:
+            mean = total[j] / k[j]
+            sd = max(np.sqrt(max(sq[j] / k[j] - mean ** 2, 0) * k[j] / (k[j] - 1)), 0.5)
+            half = z * sd * np.sqrt(r[j]) / n[j]
+            lo, hi = max(lo, mean - half), min(hi, mean + half)
+        chakra_index = logic_index.get(chakra) if logic_index else None
+        if chakra_index is not None and chakra_index.same_band((lo - 1) * 25, (hi - 1) * 25):
+            locked[j] = True
+    return locked
+
+
+def plan_page(codes, answers, locked, page_size):
+    # 從作答游標往後挑出 page_size 題尚未鎖定的題目；回傳空陣列代表測驗結束
+    cursor = len(answers)
+    rest = codes[cursor:]
+    open_mask = (rest < 0) | ~locked[np.maximum(rest, 0)] if locked is not None else np.ones(len(rest), dtype=bool)
+    return (np.flatnonzero(open_mask)[:page_size] + cursor).tolist()
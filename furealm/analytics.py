@@ -0,0 +1,93 @@
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from furealm import CHAKRA_ORDER
+
+
+class ResultAggregates:
+    """QuizResults 的增量彙總 (管理員儀表板用)。
+
+    只處理高水位線之後新 append 的列，因此每次更新的成本只跟新增列數有關。
+    QuizResults 為 append-only，新列以列位置 (rows_seen，含空白列) 向試算表要尾端資料；
+    Timestamp 最大值另外記為 high_water_mark 作為時間窗的基準。
+    """
+
+    def __init__(self, min_refresh_interval=30.0):
+        self.min_refresh_interval = min_refresh_interval
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._last_refresh = 0.0
+        self.rows_seen = 0   # 已讀過的試算表列數 (游標)
+        self.ingested = 0    # 實際彙總的紀錄數 (不含空白列)
+        self.high_water_mark = ""
+        self.by_mbti = Counter()
+        self.by_chakra = Counter()
+        self.cross = Counter()   # (MBTI, Chakra) -> 人數
+        self.hourly = Counter()  # "YYYY-MM-DD HH" -> 人數
+
+    def ingest(self, rows, rows_read=None):
+        # rows_read 為這次從試算表讀到的原始列數 (過濾空白列之前)，游標依此前進
+        with self._lock:
+            for row in rows:
+                ts = str(row.get("Timestamp") or "").strip()
+                mbti = str(row.get("MBTI") or "").strip().upper()
+                chakra = str(row.get("Chakra") or "").strip()
+                self.by_mbti[mbti] += 1
+                self.by_chakra[chakra] += 1
+                self.cross[(mbti, chakra)] += 1
+                if len(ts) >= 13:
+                    self.hourly[ts[:13]] += 1
+                if ts > self.high_water_mark:
+                    self.high_water_mark = ts
+            self.ingested += len(rows)
+            self.rows_seen += len(rows) if rows_read is None else rows_read
+
+    def refresh(self, fetch_rows, force=False):
+        # fetch_rows(start) 回傳 (第 start 列之後的新紀錄, 讀到的原始列數)；列號 0 起算、不含表頭
+        if not force and time.monotonic() - self._last_refresh < self.min_refresh_interval:
+            return False
+        if not self._refresh_lock.acquire(blocking=False):
+            return False  # 其他 session 正在更新，直接用現有彙總
+        try:
+            rows, rows_read = fetch_rows(self.rows_seen)
+            self.ingest(rows, rows_read)
+            self._last_refresh = time.monotonic()
+            return True
+        finally:
+            self._refresh_lock.release()
+
+    @property
+    def total(self):
+        return self.ingested
+
+    def chakra_counts(self):
+        with self._lock:
+            return pd.Series(dict(self.by_chakra), dtype="int64").sort_values(ascending=False)
+
+    def crosstab(self):
+        with self._lock:
+            cross = dict(self.cross)
+        if not cross:
+            return pd.DataFrame()
+        s = pd.Series(cross, dtype="int64")
+        s.index = pd.MultiIndex.from_tuples(s.index, names=["MBTI", "Chakra"])
+        table = s.unstack(fill_value=0)
+        cols = [c for c in CHAKRA_ORDER if c in table.columns] + [c for c in table.columns if c not in CHAKRA_ORDER]
+        return table[cols].sort_index()
+
+    def hourly_series(self, hours=72):
+        # 以高水位線所在小時為終點，補齊無人測驗的時段為 0
+        with self._lock:
+            hourly = dict(self.hourly)
+            hwm = self.high_water_mark
+        try:
+            end = datetime.strptime(hwm[:13], "%Y-%m-%d %H")
+        except ValueError:
+            return pd.Series(dtype="int64")
+        index = [end - timedelta(hours=h) for h in range(hours - 1, -1, -1)]
+        return pd.Series([hourly.get(t.strftime("%Y-%m-%d %H"), 0) for t in index],
+                         index=pd.DatetimeIndex(index, name="Hour"), dtype="int64")
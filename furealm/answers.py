@@ -0,0 +1,35 @@
+import numpy as np
+
+# cats 的特殊值：尚未作答 (或自適應模式略過) 的題目，以及分類不在表內的題目
+UNANSWERED = -2
+UNKNOWN_CATEGORY = -1
+
+
+class AnswerSheet:
+    """依抽出題數預先配置的作答紀錄：每題一個分類代碼與一個分數 (皆為 int8)。
+
+    len() 為目前作答游標 (下一題的位置)；自適應模式略過的題目會留在 UNANSWERED。
+    """
+
+    __slots__ = ("cats", "values", "count")
+
+    def __init__(self, size):
+        self.cats = np.full(size, UNANSWERED, dtype=np.int8)
+        self.values = np.zeros(size, dtype=np.int8)
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def record(self, idx, cat_code, value):
+        # 以題號寫入，重複點擊同一題只會覆蓋不會多記
+        self.cats[idx] = cat_code
+        self.values[idx] = value
+        self.count = max(self.count, idx + 1)
+
+    def answered(self):
+        return self.cats[:self.count], self.values[:self.count]
+
+    def asked(self):
+        # 實際作答題數 (不含略過的題目)
+        return int(np.count_nonzero(self.cats[:self.count] != UNANSWERED))
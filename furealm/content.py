@@ -0,0 +1,170 @@
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from furealm.logic_index import compile_logic_rules
+from furealm.products import build_product_table
+from furealm.question_bank import QuestionBank
+
+logger = logging.getLogger(__name__)
+
+SOURCE_TYPES = ("MBTI", "Chakra", "Logic", "Product")
+REQUIRED_TYPES = ("MBTI", "Chakra")     # 缺任一張就無法出題，不會裝成版本
+
+
+class ContentVersion:
+    """四張內容表的一個不可變版本，以及由它編譯出的索引。建立後不應再修改。"""
+
+    __slots__ = ("version", "loaded_at", "sheets", "hashes", "logic_index", "product_table", "mbti_bank", "chakra_bank")
+
+    def __init__(self, sheets, hashes, previous=None):
+        self.sheets = sheets
+        self.hashes = hashes
+        self.loaded_at = time.time()
+        self.version = hashlib.sha1("|".join(hashes.get(t) or "-" for t in SOURCE_TYPES).encode()).hexdigest()[:8]
+
+        # 表格沒變就沿用上一版編譯好的索引
+        def build(type_name, attr, factory):
+            if previous is not None and previous.hashes.get(type_name) == hashes.get(type_name):
+                return getattr(previous, attr)
+            return factory(sheets.get(type_name))
+
+        self.logic_index = build("Logic", "logic_index", compile_logic_rules)
+        self.product_table = build("Product", "product_table", build_product_table)
+        self.mbti_bank = build("MBTI", "mbti_bank", lambda df: QuestionBank(df, "Dimension") if df is not None else None)
+        self.chakra_bank = build("Chakra", "chakra_bank", lambda df: QuestionBank(df, "Chakra_Category") if df is not None else None)
+
+
+class ContentStore:
+    """stale-while-revalidate 的內容版本庫。
+
+    使用者的 rerun 只讀取目前版本 (不碰網路)；背景執行緒依 refresh_interval
+    重新驗證上游，內容有變才原子地換上新版本。session 以版本號釘住開始時的版本，
+    近期的舊版本會保留 keep_versions 個，讓測驗中的 session 不受更新影響。
+    """
+
+    def __init__(self, sources, loader, refresh_interval=300, keep_versions=8):
+        self.sources = sources          # {"MBTI": url, ...}
+        self.loader = loader            # loader(url, type_name, force) -> (df, content_hash, error)；讀不到時可直接拋出
+                                        # force=False 只用於首次載入，可直接回傳任意年齡的本機快照
+        self.refresh_interval = refresh_interval
+        self.keep_versions = keep_versions
+        self.last_refreshed = None
+        self.last_error = None
+        self.source_errors = {}         # 最近一次更新中失敗的來源 -> 錯誤訊息
+
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._versions = OrderedDict()
+        self._current = None
+        self._thread = None
+        self._prefetch_thread = None
+        self._failures = 0              # 尚無任何版本時連續載入失敗的次數
+        self._retry_at = 0.0            # 退避期間 current() / prefetch() 不重試
+        self._loaded = threading.Event()  # 第一個版本裝好後才開始背景重新驗證
+
+    def _load_all(self, force):
+        # 四張表同時下載，冷啟動時間取決於最慢的一張而不是四張相加
+        previous = self._current
+        with ThreadPoolExecutor(max_workers=len(SOURCE_TYPES), thread_name_prefix="content-fetch") as pool:
+            futures = {t: pool.submit(self.loader, self.sources.get(t), t, force) for t in SOURCE_TYPES}
+            sheets, hashes, errors = {}, {}, {}
+            for type_name, future in futures.items():
+                try:
+                    df, content_hash, error = future.result()
+                except Exception as e:
+                    logger.warning("內容表 %s 讀取失敗", type_name, exc_info=True)
+                    df, content_hash, error = None, None, repr(e)
+                if error:
+                    errors[type_name] = error
+                sheets[type_name], hashes[type_name] = df, content_hash
+        for type_name in SOURCE_TYPES:
+            df, content_hash = sheets[type_name], hashes[type_name]
+            if df is None and previous is not None:
+                # 讀不到就保留上一版的表格
+                df, content_hash = previous.sheets.get(type_name), previous.hashes.get(type_name)
+            sheets[type_name], hashes[type_name] = df, content_hash
+        return sheets, hashes, errors
+
+    def refresh(self, force=True):
+        with self._build_lock:
+            return self._refresh_locked(force)
+
+    def _refresh_locked(self, force):
+        try:
+            sheets, hashes, errors = self._load_all(force)
+        except Exception as e:
+            self.last_error = repr(e)
+            logger.warning("內容表背景更新失敗，繼續使用版本 %s", self._current and self._current.version, exc_info=True)
+            return self._current
+        # 任一來源失敗 (含改用本機快照) 都算這次更新失敗，last_refreshed 只在全部成功時前進
+        self.source_errors = errors
+        if errors:
+            self.last_error = "；".join(f"{t} {msg}" for t, msg in errors.items())
+        else:
+            self.last_refreshed = time.time()
+            self.last_error = None
+        missing = [t for t in REQUIRED_TYPES if sheets.get(t) is None]
+        if missing:
+            # 題庫不完整就不裝版本，之後依退避時間重試，而不是把缺表的版本當成已載入
+            self._failures += 1
+            self._retry_at = time.time() + min(5 * (2 ** min(self._failures - 1, 10)), self.refresh_interval)
+            if not errors:
+                self.last_error = "缺少內容表 " + "、".join(missing)
+            logger.warning("內容表 %s 無法載入，%.0f 秒後重試", "、".join(missing), self._retry_at - time.time())
+            return self._current
+        self._failures, self._retry_at = 0, 0.0
+        if self._current is not None and hashes == self._current.hashes:
+            return self._current
+
+        new = ContentVersion(sheets, hashes, previous=self._current)
+        with self._lock:
+            self._versions[new.version] = new
+            self._versions.move_to_end(new.version)
+            while len(self._versions) > self.keep_versions:
+                self._versions.popitem(last=False)
+            self._current = new
+        self._loaded.set()
+        logger.info("內容表更新為版本 %s", new.version)
+        return new
+
+    def current(self):
+        if self._current is None:
+            # 只有行程內第一次使用時會同步載入 (有本機快照時只讀磁碟)；
+            # 背景預載進行中時在鎖上等它完成，不會重複下載
+            with self._build_lock:
+                if self._current is None and time.time() >= self._retry_at:
+                    self._refresh_locked(force=False)
+        return self._current
+
+    def get(self, version):
+        # 取回 session 釘住的版本；已被淘汰時回傳 None，由呼叫端決定是否重新開始
+        with self._lock:
+            return self._versions.get(version)
+
+    def prefetch(self):
+        # 尚未有任何版本時在背景先載入，呼叫端不等待；已載入、載入中或仍在退避期間則不做事
+        if self._current is not None or time.time() < self._retry_at:
+            return
+        with self._lock:
+            if self._prefetch_thread is not None and self._prefetch_thread.is_alive():
+                return
+            self._prefetch_thread = threading.Thread(target=self.current, name="content-prefetch", daemon=True)
+            self._prefetch_thread.start()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="content-refresher", daemon=True)
+            self._thread.start()
+        self.prefetch()
+        return self
+
+    def _run(self):
+        # 首次載入可能用的是過期快照，裝好第一個版本後立刻向上游驗證一次，之後才定期更新
+        self._loaded.wait()
+        while True:
+            self.refresh(force=True)
+            time.sleep(self.refresh_interval)
@@ -0,0 +1,143 @@
+import logging
+import re
+from bisect import bisect_left, bisect_right
+from typing import NamedTuple
+
+import numpy as np
+
+from furealm import CHAKRA_ORDER
+
+logger = logging.getLogger(__name__)
+
+
+class LogicRule(NamedTuple):
+    min_v: int
+    max_v: int
+    status: object
+    trigger: object
+    copy: object
+    order: int  # 在 Logic 表中的原始順序 (重疊區間時先出現者優先)
+
+
+class ChakraRuleIndex(NamedTuple):
+    # points[i] 為排序後的區間端點；at_point[i] 為分數剛好等於端點時的命中規則，
+    # between[i] 為落在 (points[i], points[i+1]) 之間時的命中規則
+    points: list
+    at_point: list
+    between: list
+
+    def lookup(self, score):
+        i = bisect_left(self.points, score)
+        if i < len(self.points) and self.points[i] == score:
+            return self.at_point[i]
+        if 0 < i < len(self.points):
+            return self.between[i - 1]
+        return None
+
+    def same_band(self, lo, hi):
+        # [lo, hi] 內的任何分數是否都落在同一條規則 (或同樣沒有規則)
+        first = self.lookup(lo)
+        start = bisect_left(self.points, lo)
+        end = bisect_right(self.points, hi)
+        for i in range(start, end):
+            if self.at_point[i] is not first:
+                return False
+            if i + 1 < len(self.points) and self.points[i + 1] <= hi and self.between[i] is not first:
+                return False
+        # hi 落在最後一個端點之後的空隙，或 lo 與 hi 之間沒有端點時，比對 hi 本身
+        return self.lookup(hi) is first
+
+
+def parse_score_range(value):
+    # Regex 抓取所有數字，前兩個即為 (下限, 上限)
+    matches = re.findall(r'\d+', str(value).strip())
+    if len(matches) < 2:
+        return None
+    return int(matches[0]), int(matches[1])
+
+
+def _build_chakra_index(rules):
+    points = sorted({r.min_v for r in rules} | {r.max_v for r in rules})
+    at_point, between = [], []
+    for i, p in enumerate(points):
+        at_point.append(next((r for r in rules if r.min_v <= p <= r.max_v), None))
+        if i + 1 < len(points):
+            nxt = points[i + 1]
+            between.append(next((r for r in rules if r.min_v <= p and nxt <= r.max_v), None))
+    return ChakraRuleIndex(points, at_point, between)
+
+
+def compile_logic_rules(df_logic, chakras=CHAKRA_ORDER):
+    # 將 Logic 表一次編譯成「脈輪 -> 排序區間索引」，之後每次查詢皆為二分搜尋
+    if df_logic is None or df_logic.empty:
+        return {}
+    if 'Chakra_Category' not in df_logic.columns or 'Score_Range' not in df_logic.columns:
+        logger.warning("Logic 表缺少 Chakra_Category 或 Score_Range 欄位，已略過")
+        return {}
+
+    records = df_logic.to_dict('records')
+    categories = df_logic['Chakra_Category'].astype(str).tolist()
+
+    rules, bad_rows = [], []
+    for order, row in enumerate(records):
+        parsed = parse_score_range(row['Score_Range'])
+        if parsed is None:
+            bad_rows.append((order, row['Score_Range']))
+            continue
+        rules.append((categories[order], LogicRule(
+            parsed[0], parsed[1],
+            row.get('Status', 'Status'),
+            row.get('Trigger', ''),
+            row.get('Action_Copy', '暫無建議'),
+            order,
+        )))
+    if bad_rows:
+        logger.warning(
+            "Logic 表有 %d 列分數區間無法解析，已略過: %s",
+            len(bad_rows), ", ".join(f"第 {i + 2} 列 {v!r}" for i, v in bad_rows),
+        )
+
+    index = {}
+    for chakra in chakras:
+        # 篩選脈輪 (模糊比對前兩個字，與原本 str.contains 行為一致)
+        matched = [r for cat, r in rules if chakra[:2] in cat]
+        index[chakra] = _build_chakra_index(matched)
+    return index
+
+
+def get_advice(index, chakra, score):
+    chakra_index = index.get(chakra)
+    if chakra_index is None:
+        return None
+    return advice_record(chakra_index.lookup(score))
+
+
+def _object_array(items):
+    # LogicRule 本身是 tuple，不能直接 np.array(...)，否則會被展開成二維
+    arr = np.empty(len(items), dtype=object)
+    for j, item in enumerate(items):
+        arr[j] = item
+    return arr
+
+
+def lookup_many(chakra_index, scores):
+    # 一次查詢多個分數 (批次重算用)，回傳與 scores 等長的規則陣列 (無符合為 None)
+    result = np.full(len(scores), None, dtype=object)
+    if chakra_index is None or not chakra_index.points:
+        return result
+    points = np.asarray(chakra_index.points, dtype=float)
+    at_point = _object_array(chakra_index.at_point)
+    between = _object_array(chakra_index.between)
+    scores = np.asarray(scores, dtype=float)
+    i = np.searchsorted(points, scores, side="left")
+    exact = (i < len(points)) & (points[np.minimum(i, len(points) - 1)] == scores)
+    inside = ~exact & (i > 0) & (i < len(points))
+    result[exact] = at_point[i[exact]]
+    result[inside] = between[i[inside] - 1]
+    return result
+
+
+def advice_record(rule):
+    if rule is None:
+        return None
+    return {"status": rule.status, "trigger": rule.trigger, "copy": rule.copy}
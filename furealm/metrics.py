@@ -0,0 +1,154 @@
+"""行程內的輕量計時 / 計數器。
+
+關閉時 timer() 回傳共用的空 context、timed() 直接回傳原函式，熱路徑上沒有額外成本；
+開啟時每次量測只是一次 perf_counter 與 deque.append。
+"""
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
+from functools import wraps
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+QUANTILES = (50, 95, 99)
+_NULL_TIMER = nullcontext()
+
+
+class Histogram:
+    # count / total / max 為累計值；百分位數取最近 window 筆樣本
+    __slots__ = ("count", "total", "max", "samples")
+
+    def __init__(self, window=2048):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = deque(maxlen=window)
+
+    def observe(self, value):
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+        self.samples.append(value)
+
+    def summary(self):
+        out = {"count": self.count, "mean": self.total / self.count if self.count else 0.0, "max": self.max}
+        values = np.percentile(np.fromiter(self.samples, dtype=float), QUANTILES) if self.samples else [0.0] * len(QUANTILES)
+        out.update({f"p{q}": float(v) for q, v in zip(QUANTILES, values)})
+        return out
+
+
+class _Timer:
+    __slots__ = ("metrics", "name", "start")
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        # st.rerun() / st.stop() 以例外結束也照樣記錄
+        self.metrics.observe(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class Metrics:
+    def __init__(self, enabled=True, window=2048):
+        self.enabled = enabled
+        self.window = window
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+        self._timers = {}    # name -> Histogram (秒)
+        self._counters = {}  # name -> int
+        self._exporter = None
+
+    def timer(self, name):
+        return _Timer(self, name) if self.enabled else _NULL_TIMER
+
+    def timed(self, name):
+        def decorator(fn):
+            if not self.enabled:
+                return fn
+
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                with _Timer(self, name):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def observe(self, name, seconds):
+        if not self.enabled:
+            return
+        with self._lock:
+            hist = self._timers.get(name)
+            if hist is None:
+                hist = self._timers[name] = Histogram(self.window)
+            hist.observe(seconds)
+
+    def incr(self, name, n=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    def snapshot(self):
+        with self._lock:
+            timers = {name: hist.summary() for name, hist in sorted(self._timers.items())}
+            counters = dict(sorted(self._counters.items()))
+        return {"uptime": time.time() - self.started_at, "timers": timers, "counters": counters}
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), ensure_ascii=False, indent=2)
+
+    def to_text(self):
+        # Prometheus text exposition 格式，可交給 node_exporter 的 textfile collector 抓取
+        snap = self.snapshot()
+        lines = ["# TYPE furealm_stage_seconds summary"]
+        for name, s in snap["timers"].items():
+            for q in QUANTILES:
+                lines.append(f'furealm_stage_seconds{{stage="{name}",quantile="{q / 100:g}"}} {s[f"p{q}"]:.6f}')
+            lines.append(f'furealm_stage_seconds_sum{{stage="{name}"}} {s["mean"] * s["count"]:.6f}')
+            lines.append(f'furealm_stage_seconds_count{{stage="{name}"}} {s["count"]}')
+        lines.append("# TYPE furealm_events_total counter")
+        for name, value in snap["counters"].items():
+            lines.append(f'furealm_events_total{{event="{name}"}} {value}')
+        lines.append(f"furealm_uptime_seconds {snap['uptime']:.0f}")
+        return "\n".join(lines) + "\n"
+
+    def write_files(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        for filename, body in (("metrics.json", self.to_json()), ("metrics.prom", self.to_text())):
+            path = os.path.join(directory, filename)
+            with open(path + ".tmp", "w", encoding="utf-8") as f:
+                f.write(body)
+            os.replace(path + ".tmp", path)
+
+    def start_exporter(self, directory, interval=30.0):
+        # 定期把快照寫到磁碟，供外部收集器抓取
+        if not self.enabled or interval <= 0 or self._exporter is not None:
+            return
+
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.write_files(directory)
+                except OSError:
+                    logger.warning("無法寫出效能指標到 %s", directory, exc_info=True)
+
+        self._exporter = threading.Thread(target=run, name="metrics-exporter", daemon=True)
+        self._exporter.start()
+
+
+# 未注入 Metrics 的元件使用這個關閉中的實例
+NULL_METRICS = Metrics(enabled=False)
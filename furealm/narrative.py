@@ -0,0 +1,126 @@
+"""AI 個人化解讀 (選用功能)。
+
+相近的用戶共用同一份生成結果：prompt 只使用 MBTI、分桶後的能量指數、各脈輪狀態與優先校準脈輪，
+這些連同內容版本全部放進快取鍵，因此同一個鍵對應的文字對鍵內所有用戶都成立。模型呼叫為可抽換的 generator(prompt) -> 文字片段，
+測試 / 壓測可改用 stub_generator，不需要 API 金鑰與網路。
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from furealm import CHAKRA_ORDER
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = "gemini-2.5-flash"
+
+
+def profile_key(report, bucket=10):
+    # 能量指數 0-100 每 bucket 分一格；100 分併入最後一格。
+    # 狀態依精確分數查表，同一格內可能不同 (如 40 / 41 分跨過門檻)，因此與優先校準脈輪一併列入鍵
+    top = (100 - 1) // bucket
+    buckets = tuple(min(int(v // bucket), top) for v in report.converted)
+    statuses = tuple(advice["status"] if advice else None for advice in report.advice)
+    return (report.mbti.upper(), buckets, statuses, tuple(report.targets), report.version)
+
+
+def build_prompt(report, bucket=10):
+    mbti, buckets, statuses, targets, _ = profile_key(report, bucket)
+    lines = []
+    for chakra, b, status in zip(CHAKRA_ORDER, buckets, statuses):
+        status = f"，狀態：{status}" if status is not None else ""
+        lines.append(f"- {chakra}：{b * bucket}-{min(b * bucket + bucket, 100)} 分{status}")
+    return (
+        "你是 Fù Realm 的能量療癒顧問，請用繁體中文、溫暖而具體的語氣，寫一段約 250 字的個人化解讀。\n"
+        f"MBTI：{mbti} ({report.group} 型氣質)\n"
+        "脈輪能量指數 (0-100，61-85 為理想範圍)：\n" + "\n".join(lines) + "\n"
+        f"優先校準的脈輪：{'、'.join(targets)}\n"
+        "請說明這個性格類型為何容易出現這樣的能量分布，以及日常可以怎麼調整。不要提到商品或價格。"
+    )
+
+
+def gemini_generator(api_key, model_name=DEFAULT_MODEL):
+    # 延後載入 google-generativeai，沒啟用 AI 解讀時完全不匯入
+    import google.generativeai as genai
+
+    genai.configure(api_key=api_key)
+    model = genai.GenerativeModel(model_name)
+
+    def generate(prompt):
+        for chunk in model.generate_content(prompt, stream=True):
+            text = getattr(chunk, "text", "")
+            if text:
+                yield text
+    return generate
+
+
+def stub_generator(delay=0.0, chunk_size=8):
+    # 本機替身：把 prompt 的摘要切成片段逐段吐出，delay 模擬每個片段的模型延遲
+    def generate(prompt):
+        body = "【示範解讀】" + prompt.split("\n", 1)[1]
+        for i in range(0, len(body), chunk_size):
+            if delay:
+                time.sleep(delay)
+            yield body[i:i + chunk_size]
+    return generate
+
+
+class NarrativeCache:
+    """依 UTF-8 位元組總量淘汰的 LRU 快取。"""
+
+    def __init__(self, max_bytes=2 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def get(self, key):
+        with self._lock:
+            text = self._items.get(key)
+            if text is None:
+                self.stats["misses"] += 1
+                return None
+            self._items.move_to_end(key)
+            self.stats["hits"] += 1
+            return text
+
+    def put(self, key, text):
+        cost = len(text.encode("utf-8"))
+        if cost > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.size -= len(old.encode("utf-8"))
+            self._items[key] = text
+            self.size += cost
+            while self.size > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self.size -= len(evicted.encode("utf-8"))
+                self.stats["evictions"] += 1
+
+    def __len__(self):
+        return len(self._items)
+
+
+class NarrativeService:
+    def __init__(self, generator, cache=None, bucket=10):
+        self.generator = generator
+        self.cache = cache if cache is not None else NarrativeCache()
+        self.bucket = bucket
+
+    def stream(self, report):
+        # 命中快取時一次吐出全文；否則邊生成邊吐出，完整生成後才寫入快取 (中途失敗不快取)
+        key = profile_key(report, self.bucket)
+        cached = self.cache.get(key)
+        if cached is not None:
+            yield cached
+            return
+        parts = []
+        for part in self.generator(build_prompt(report, self.bucket)):
+            parts.append(part)
+            yield part
+        if parts:
+            self.cache.put(key, "".join(parts))
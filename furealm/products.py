@@ -0,0 +1,41 @@
+from furealm import CHAKRA_ORDER, MBTI_GROUPS
+
+
+def _pick_product(rows, user_mbti, user_group):
+    # 優先順序：MBTI 完全符合 > 氣質群組 > ALL > 該脈輪第一件備選
+    tiers = [t for t in (user_mbti, user_group) if t] + ["ALL"]
+    for key in tiers:
+        for targets, row in rows:
+            if key in targets:
+                return row
+    return rows[0][1] if rows else None
+
+
+def build_product_table(df_prod, chakras=CHAKRA_ORDER, mbti_types=tuple(MBTI_GROUPS)):
+    # 7 脈輪 x 16 型 的推薦結果一次算好，渲染時只需查 dict
+    table = {}
+    if df_prod is None or df_prod.empty or 'Chakra_Category' not in df_prod.columns:
+        return table
+
+    records = df_prod.to_dict('records')
+    categories = df_prod['Chakra_Category'].astype(str).tolist()
+    if 'MBTI_Match' in df_prod.columns:
+        match_col = df_prod['MBTI_Match'].astype(str).str.upper().tolist()
+    else:
+        match_col = ["NAN"] * len(records)
+
+    for chakra in chakras:
+        # 篩選對應脈輪 (取前兩個字匹配)
+        rows = [(match_col[i], records[i]) for i, cat in enumerate(categories) if chakra[:2] in cat]
+        for mbti in mbti_types:
+            table[(chakra, mbti)] = _pick_product(rows, mbti, MBTI_GROUPS.get(mbti, ""))
+        # 非 16 型之外的輸入 (理論上不會發生) 只能用 ALL / 第一件備選
+        table[(chakra, None)] = _pick_product(rows, None, "")
+    return table
+
+
+def recommend_product(table, chakra, user_mbti):
+    key = (chakra, str(user_mbti).upper())
+    if key in table:
+        return table[key]
+    return table.get((chakra, None))
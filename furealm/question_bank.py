@@ -0,0 +1,45 @@
+import random
+
+import numpy as np
+
+
+class QuestionBank:
+    """依分類建好索引的共用題庫 (每個內容版本一份，建立後唯讀)。
+
+    session 只保存抽到的題目位置陣列 (question id)，渲染時再回到這裡取題目內容。
+    """
+
+    __slots__ = ("records", "positions", "id_dtype")
+
+    def __init__(self, df, type_col):
+        self.records = df.to_dict('records')
+        self.id_dtype = np.int16 if len(df) < 2 ** 15 else np.int32
+        if type_col in df.columns:
+            self.positions = {cat: pos.astype(self.id_dtype) for cat, pos in df.groupby(type_col, sort=False).indices.items()}
+        else:
+            self.positions = {}
+
+    def __len__(self):
+        return len(self.records)
+
+    def draw(self, categories, count_per_cat):
+        # 每個分類抽 count_per_cat 題後整體打亂，成本只跟抽出的題數有關
+        selected = []
+        for cat in categories:
+            pos = self.positions.get(cat)
+            if pos is None or len(pos) == 0:
+                continue
+            n = min(len(pos), count_per_cat)
+            selected.append(pos[random.sample(range(len(pos)), n)])
+        if not selected:
+            return np.empty(0, dtype=self.id_dtype)
+        ids = np.concatenate(selected)
+        random.shuffle(ids)
+        return ids
+
+    def all_ids(self):
+        # 依原表順序出全部題目 (深層型 MBTI)
+        return np.arange(len(self.records), dtype=self.id_dtype)
+
+    def row(self, qid):
+        return self.records[qid]
@@ -0,0 +1,41 @@
+from typing import NamedTuple
+
+from furealm import CHAKRA_ORDER, MBTI_GROUPS
+from furealm.scoring import means_vector, score_batch
+
+
+class ResultReport(NamedTuple):
+    """測驗結束後一次算好的報告；之後的 rerun 只負責渲染。"""
+    version: str         # 計算時使用的內容版本
+    mbti: str
+    group: str
+    converted: tuple     # 依 CHAKRA_ORDER 的 0-100 能量指數
+    advice: tuple        # 依 CHAKRA_ORDER 的 advice dict (無資料為 None)
+    targets: tuple       # 優先校準的前 3 個脈輪
+    products: tuple      # 對應 targets 的推薦商品 (無商品為 None)
+    radar_key: tuple     # 雷達圖快取鍵，分數相同的用戶共用同一張圖
+
+    def scores(self):
+        return dict(zip(CHAKRA_ORDER, self.converted))
+
+
+def radar_key(converted):
+    # 換算後分數為 25 / 題數 的倍數，四捨五入到小數 4 位即可當作穩定的鍵
+    return tuple(round(float(v), 4) for v in converted)
+
+
+def build_report(chakra_res, mbti, content):
+    logic_index = content.logic_index if content else {}
+    product_table = content.product_table if content else {}
+    batch = score_batch(means_vector(chakra_res), [mbti], logic_index, product_table)
+    converted = tuple(batch.converted[0].tolist())
+    return ResultReport(
+        version=content.version if content else "",
+        mbti=mbti,
+        group=MBTI_GROUPS.get(mbti.upper(), ""),
+        converted=converted,
+        advice=tuple(batch.advice[0]),
+        targets=tuple(batch.target_names(0)),
+        products=tuple(batch.products[0]),
+        radar_key=radar_key(converted),
+    )
@@ -0,0 +1,73 @@
+"""離線批次重算 QuizResults 歷史紀錄。
+
+Logic 表或門檻調整後，用最新規則重新計算每筆紀錄的優先校準脈輪、狀態與推薦商品：
+
+    python -m furealm.rescore QuizResults.csv --logic LOGIC_CSV --product PRODUCT_CSV -o rescored.csv
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from furealm import CHAKRA_ORDER
+from furealm.logic_index import compile_logic_rules
+from furealm.products import build_product_table
+from furealm.result_logger import RESULT_COLUMNS
+from furealm.scoring import score_batch
+from furealm.sheet_cache import normalize_columns
+
+
+def with_chakra_columns(results):
+    # 表頭未補上脈輪欄位的舊試算表，匯出後這幾欄是 Unnamed: N；依寫入時的欄位位置 (E:K) 補回名稱
+    if any(c in results.columns for c in CHAKRA_ORDER) or results.shape[1] < len(RESULT_COLUMNS):
+        return results
+    start = RESULT_COLUMNS.index(CHAKRA_ORDER[0])
+    names = list(results.columns)
+    names[start:start + len(CHAKRA_ORDER)] = CHAKRA_ORDER
+    return results.set_axis(names, axis=1)
+
+
+def rescore_history(results, logic_index, product_table, k=3):
+    # 只重算有記錄脈輪平均分的列 (早期紀錄只有最低脈輪，無法重算)
+    results = with_chakra_columns(results.reset_index(drop=True))
+    cols = [c for c in CHAKRA_ORDER if c in results.columns]
+    if not cols:
+        return pd.DataFrame()
+    means = results.reindex(columns=CHAKRA_ORDER).apply(pd.to_numeric, errors="coerce").to_numpy(dtype=float)
+    has_scores = ~np.isnan(means).all(axis=1)
+    subset = results[has_scores]
+    mbtis = subset["MBTI"].astype(str).str.strip().str.upper().tolist() if "MBTI" in subset else [""] * len(subset)
+
+    batch = score_batch(means[has_scores], mbtis, logic_index, product_table, k=k)
+
+    out = pd.DataFrame({"Timestamp": subset.get("Timestamp"), "MBTI": mbtis}, index=subset.index)
+    for t in range(batch.targets.shape[1]):
+        out[f"Target_{t + 1}"] = [CHAKRA_ORDER[c] for c in batch.targets[:, t]]
+        out[f"Product_{t + 1}"] = [(p[t] or {}).get("Product_ID") for p in batch.products]
+    for j, chakra in enumerate(CHAKRA_ORDER):
+        out[f"{chakra}_Score"] = batch.converted[:, j]
+        out[f"{chakra}_Status"] = [(a[j] or {}).get("status") for a in batch.advice]
+    return out.reset_index(drop=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="以目前的 Logic / Product 表重算 QuizResults 歷史紀錄")
+    parser.add_argument("results", help="QuizResults 匯出的 CSV")
+    parser.add_argument("--logic", required=True, help="Logic 表 CSV 路徑或網址")
+    parser.add_argument("--product", help="Product 表 CSV 路徑或網址")
+    parser.add_argument("-o", "--output", default="rescored.csv")
+    args = parser.parse_args(argv)
+
+    results = pd.read_csv(args.results, encoding="utf-8-sig")
+    logic_index = compile_logic_rules(normalize_columns(pd.read_csv(args.logic, encoding="utf-8-sig")))
+    product_table = {}
+    if args.product:
+        product_table = build_product_table(normalize_columns(pd.read_csv(args.product, encoding="utf-8-sig")))
+
+    out = rescore_history(results, logic_index, product_table)
+    out.to_csv(args.output, index=False, encoding="utf-8-sig")
+    print(f"重算 {len(out)} / {len(results)} 筆紀錄 -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+import json
+import logging
+import os
+import threading
+
+from furealm import CHAKRA_ORDER
+
+logger = logging.getLogger(__name__)
+
+# 前四欄為原本的紀錄；之後附上各脈輪 1-5 平均分，供離線批次重算使用
+RESULT_COLUMNS = ["Timestamp", "MBTI", "Chakra", "Action"] + CHAKRA_ORDER
+
+
+def ensure_header(worksheet, columns=RESULT_COLUMNS):
+    """確認第一列表頭涵蓋 columns；舊試算表只有前四欄時補上新欄位名稱，回傳是否有更新。
+
+    表頭與 columns 對不上 (人工改過欄位) 時不覆寫，只記錄警告。
+    """
+    header = [str(c).strip() for c in worksheet.row_values(1)]
+    if header[:len(columns)] == list(columns):
+        return False
+    if header != list(columns[:len(header)]):
+        logger.warning("QuizResults 表頭與預期欄位不符，未自動更新：%s", header)
+        return False
+    # 只補尾端缺少的欄位 (最多 26 欄，直接換算欄位字母)
+    worksheet.update(range_name=f"{chr(ord('A') + len(header))}1", values=[list(columns[len(header):])])
+    logger.info("QuizResults 表頭補上 %d 個欄位", len(columns) - len(header))
+    return True
+
+
+class ResultLogger:
+    """QuizResults 的 write-behind 寫入器。
+
+    每筆結果先寫入本機 journal (fsync) 再進記憶體佇列，背景執行緒依
+    筆數 / 時間條件批次 append 到試算表。重啟時會重播 journal 中尚未寫出的列，
+    因此是 at-least-once：若在 append 成功後、offset 落盤前當機，重啟後可能重送一次。
+    """
+
+    def __init__(self, append_rows, journal_path, batch_size=20, flush_interval=5.0):
+        self._append_rows = append_rows
+        self._journal_path = journal_path
+        self._offset_path = journal_path + ".offset"
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._pending = []  # [(seq, row)]
+        self._next_seq = 1
+        self._failures = 0  # 連續失敗次數，用於退避
+        self._committed = 0  # 已 append 成功的最大 seq
+        self._persisted = 0  # 已寫入 offset 檔 / 已從 journal 壓縮掉的最大 seq
+        self.stats = {"queued": 0, "flushed": 0, "failed": 0, "replayed": 0}
+
+        os.makedirs(os.path.dirname(journal_path) or ".", exist_ok=True)
+        self._replay()
+
+        self._worker = threading.Thread(target=self._run, name="quiz-result-logger", daemon=True)
+        self._worker.start()
+
+    # --- journal ---
+    def _read_offset(self):
+        try:
+            with open(self._offset_path, encoding="utf-8") as f:
+                return int(f.read().strip() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    def _write_offset(self, seq):
+        tmp = self._offset_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(str(seq))
+        os.replace(tmp, self._offset_path)
+
+    def _compact(self):
+        # 只保留尚未寫出的列 (seq > committed)，避免流量不斷時 journal 無限成長；須持有 _lock
+        tmp = self._journal_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for seq, row in self._pending:
+                f.write(json.dumps({"seq": seq, "row": row}, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self._journal_path)
+
+    def _persist_committed(self):
+        # 先壓縮 journal 再記 offset：任一步失敗 (磁碟滿 / 唯讀) 只記錄，下次 flush 再試，worker 不中斷。
+        # 兩步都沒成功前當機，重啟後已寫出的列會重送 (at-least-once)
+        with self._lock:
+            committed = self._committed
+            if committed <= self._persisted:
+                return
+            try:
+                self._compact()
+                self._write_offset(committed)
+            except OSError:
+                logger.exception("QuizResults journal 壓縮 / offset 寫入失敗，稍後重試")
+                return
+            self._persisted = committed
+
+    def _replay(self):
+        committed = self._read_offset()
+        self._committed = self._persisted = committed
+        self._next_seq = committed + 1
+        if not os.path.exists(self._journal_path):
+            return
+        with open(self._journal_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # 當機時寫到一半的最後一行
+                seq = entry["seq"]
+                self._next_seq = max(self._next_seq, seq + 1)
+                if seq > committed:
+                    self._pending.append((seq, entry["row"]))
+        self.stats["replayed"] = len(self._pending)
+        if self._pending:
+            logger.info("QuizResults journal 重播 %d 筆未寫出的結果", len(self._pending))
+
+    # --- 對外介面 ---
+    def enqueue(self, row):
+        with self._lock:
+            seq = self._next_seq
+            self._next_seq += 1
+            with open(self._journal_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"seq": seq, "row": row}, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self._pending.append((seq, row))
+            self.stats["queued"] += 1
+            if len(self._pending) >= self.batch_size and not self._failures:
+                self._wake.set()
+
+    def pending_count(self):
+        with self._lock:
+            return len(self._pending)
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                batch = list(self._pending)
+            if not batch:
+                self._persist_committed()
+                return 0
+            try:
+                self._append_rows([row for _, row in batch])
+            except Exception:
+                with self._lock:
+                    self.stats["failed"] += len(batch)
+                    self._failures += 1
+                logger.exception("QuizResults 批次寫入失敗，%d 筆保留於 journal 待重試", len(batch))
+                return 0
+
+            with self._lock:
+                self._failures = 0
+                del self._pending[:len(batch)]
+                self.stats["flushed"] += len(batch)
+                self._committed = batch[-1][0]
+            self._persist_committed()
+            return len(batch)
+
+    def _run(self):
+        while True:
+            # 連續失敗時指數退避 (最長 5 分鐘)，避免 API 故障時持續重打；
+            # 指數設上限，長時間故障下 2 ** 次數不會大到讓 float 溢位而讓 worker 結束
+            delay = min(self.flush_interval * (2 ** min(self._failures, 10)), 300)
+            self._wake.wait(delay)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                # 任何意外都不能讓 worker 結束，否則之後的結果永遠不會寫出
+                logger.exception("QuizResults 背景寫入發生未預期錯誤")
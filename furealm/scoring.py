@@ -0,0 +1,103 @@
+from typing import NamedTuple
+
+import numpy as np
+
+from furealm import CHAKRA_ORDER
+from furealm.logic_index import advice_record, lookup_many
+from furealm.products import recommend_product
+
+MBTI_DIMS = ['E / I', 'S / N', 'T / F', 'J / P']
+DIM_CODES = {d: i for i, d in enumerate(MBTI_DIMS)}
+CHAKRA_CODES = {c: i for i, c in enumerate(CHAKRA_ORDER)}
+
+# MBTI 作答值：A 記 1、B 記 0
+ANSWER_A, ANSWER_B = 1, 0
+
+
+def score_mbti(sheet):
+    # 各維度多數決 (A >= B 取前字母)，一次 bincount 完成
+    cats, values = sheet.answered()
+    if len(cats) == 0:
+        return ""
+    valid = cats >= 0
+    cats, values = cats[valid], values[valid]
+    a_count = np.bincount(cats, weights=values == ANSWER_A, minlength=len(MBTI_DIMS))
+    b_count = np.bincount(cats, weights=values == ANSWER_B, minlength=len(MBTI_DIMS))
+    return "".join(d[0] if a >= b else d[4] for d, a, b in zip(MBTI_DIMS, a_count, b_count))
+
+
+def score_chakras(sheet):
+    # 各脈輪平均分 (1-5)，只回傳有作答的脈輪
+    cats, values = sheet.answered()
+    valid = cats >= 0
+    cats, values = cats[valid], values[valid]
+    sums = np.bincount(cats, weights=values, minlength=len(CHAKRA_ORDER))
+    counts = np.bincount(cats, minlength=len(CHAKRA_ORDER))
+    return {CHAKRA_ORDER[i]: float(sums[i] / counts[i]) for i in np.flatnonzero(counts)}
+
+
+def means_vector(chakra_res):
+    # {脈輪: 平均分} 轉成依 CHAKRA_ORDER 排列的向量，未作答為 NaN
+    return np.array([chakra_res.get(k, np.nan) for k in CHAKRA_ORDER], dtype=float)
+
+
+def convert_scores(means):
+    # 1-5 平均分換算成 0-100 能量指數 (未作答的脈輪比照原本流程視為 0 分)
+    return (np.nan_to_num(np.asarray(means, dtype=float), nan=0.0) - 1) * 25
+
+
+# --- 失衡權重：理想區間 61-85，不足區與過度區以「百分比偏移」計算 ---
+IDEAL_LOW, IDEAL_HIGH = 61, 85
+OVER_SENSITIVITY = 2.5
+
+
+def imbalance_scores(converted):
+    # 不足區：(理想下限 61 - 實際分數) / 不足區總長度 61
+    # 過度區：(實際分數 - 理想上限 85) / 過度區總長度 15，再乘 2.5 倍敏感係數平衡高低分區的區間差異
+    converted = np.asarray(converted, dtype=float)
+    under = (IDEAL_LOW - converted) / IDEAL_LOW
+    over = ((converted - IDEAL_HIGH) / (100 - IDEAL_HIGH)) * OVER_SENSITIVITY
+    return np.where(converted < IDEAL_LOW, under, np.where(converted > IDEAL_HIGH, over, 0.0))
+
+
+def top_targets(imbalance, k=3):
+    # 失衡度由高到低取前 k 名；同分時依 CHAKRA_ORDER 先後 (穩定排序)
+    return np.argsort(-np.asarray(imbalance), axis=-1, kind="stable")[..., :k]
+
+
+class ScoreBatch(NamedTuple):
+    converted: np.ndarray   # (n, 7) 0-100 能量指數
+    imbalance: np.ndarray   # (n, 7) 失衡權重
+    targets: np.ndarray     # (n, k) 優先校準的脈輪代碼 (對應 CHAKRA_ORDER)
+    advice: list            # n 筆，每筆 7 個 advice dict (無符合區間為 None)
+    products: list          # n 筆，每筆 k 個推薦商品 (無商品為 None)
+
+    def target_names(self, row):
+        return [CHAKRA_ORDER[c] for c in self.targets[row]]
+
+
+def score_batch(means, mbtis, logic_index=None, product_table=None, k=3):
+    """一次計算多位用戶的報告。
+
+    means 為 (n, 7) 的 1-5 平均分 (依 CHAKRA_ORDER，NaN 表示未作答，比照單人流程視為 0 分)，
+    mbtis 為 n 個 MBTI 字串。
+    """
+    converted = convert_scores(np.atleast_2d(means))
+    imbalance = imbalance_scores(converted)
+    targets = top_targets(imbalance, k)
+    n = len(converted)
+
+    advice = [[None] * len(CHAKRA_ORDER) for _ in range(n)]
+    if logic_index:
+        for j, chakra in enumerate(CHAKRA_ORDER):
+            rules = lookup_many(logic_index.get(chakra), converted[:, j])
+            for i in np.flatnonzero(rules != None):  # noqa: E711 (object 陣列逐元素比較)
+                advice[i][j] = advice_record(rules[i])
+
+    products = [[None] * targets.shape[1] for _ in range(n)]
+    if product_table:
+        for i in range(n):
+            for t, code in enumerate(targets[i]):
+                products[i][t] = recommend_product(product_table, CHAKRA_ORDER[code], mbtis[i])
+
+    return ScoreBatch(converted, imbalance, targets, advice, products)
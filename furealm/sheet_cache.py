@@ -0,0 +1,194 @@
+import glob
+import hashlib
+import io
+import json
+import logging
+import os
+import time
+import urllib.error
+import urllib.request
+
+from furealm.metrics import NULL_METRICS
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_columns(df):
+    # 各分頁欄位名稱不一，統一改成程式使用的英文欄名
+    df.columns = df.columns.str.strip()
+
+    rename_map = {}
+    for col in df.columns:
+        c = col.lower().replace("_", "").replace(" ", "").replace("(", "").replace(")", "")
+
+        # --- 通用欄位 ---
+        if any(x in c for x in ["題目", "問題", "question", "content"]): rename_map[col] = "Question"
+        elif any(x in c for x in ["模式", "type", "mode"]): rename_map[col] = "Mode"
+        elif any(x in c for x in ["維度", "dim"]): rename_map[col] = "Dimension"
+        elif "optiona" in c or "選項a" in c: rename_map[col] = "Option_A"
+        elif "optionb" in c or "選項b" in c: rename_map[col] = "Option_B"
+        elif any(x in c for x in ["分類", "脈輪", "category", "chakra", "focus"]): rename_map[col] = "Chakra_Category"
+
+        # --- Logic 表專用 ---
+        elif "range" in c or "區間" in c: rename_map[col] = "Score_Range"
+        elif "status" in c or "狀態" in c or "label" in c: rename_map[col] = "Status"
+        elif "trigger" in c or "觸發" in c: rename_map[col] = "Trigger"
+        elif "copy" in c or "文案" in c or "action" in c: rename_map[col] = "Action_Copy"
+        elif "mapping" in c or "索引" in c or "logic" in c: rename_map[col] = "Product_Mapping"
+
+        # --- Product 表專用 ---
+        elif "product" in c or "商品" in c or "id" in c: rename_map[col] = "Product_ID"
+        elif "name" in c or "名稱" in c: rename_map[col] = "Product_Name"
+        elif "gem" in c or "晶石" in c or "stone" in c: rename_map[col] = "Gemstones"
+        elif "link" in c or "連結" in c or "url" in c: rename_map[col] = "Store_Link"
+        elif "match" in c or "mbti" in c: rename_map[col] = "MBTI_Match"
+        elif "desc" in c or "說明" in c or "描述" in c: rename_map[col] = "Description"
+
+    df.rename(columns=rename_map, inplace=True)
+    # 多個原始欄位對應到同一欄名時 (例如 Product_ID 與 Product_Name 都含 "product") 只保留第一個，
+    # 重複欄名會讓 df[col] 變成 DataFrame，也無法寫成 parquet 快照
+    duplicated = df.columns.duplicated()
+    if duplicated.any():
+        logger.warning("欄名重複，只保留第一個：%s", sorted(set(df.columns[duplicated])))
+        df = df.loc[:, ~duplicated]
+    return df
+
+
+def parse_csv(raw):
+    # pandas 延後載入：冷啟動時由背景預載執行緒負擔，不擋住第一個畫面
+    import pandas as pd
+    # utf-8-sig 同時相容有 / 無 BOM 的檔案，只需解析一次
+    return normalize_columns(pd.read_csv(io.BytesIO(raw), encoding='utf-8-sig'))
+
+
+def fetch_csv(url, etag=None, last_modified=None, timeout=10):
+    """下載 CSV，支援條件式請求。回傳 (status, body, etag, last_modified)，304 時 body 為 None。"""
+    if "://" not in url:
+        # 本機路徑 (測試 / 壓測用)：以 mtime 當作 Last-Modified
+        mtime = str(os.path.getmtime(url))
+        if last_modified == mtime:
+            return 304, None, etag, last_modified
+        with open(url, "rb") as f:
+            return 200, f.read(), None, mtime
+
+    request = urllib.request.Request(url)
+    if etag:
+        request.add_header("If-None-Match", etag)
+    if last_modified:
+        request.add_header("If-Modified-Since", last_modified)
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as resp:
+            return resp.status, resp.read(), resp.headers.get("ETag"), resp.headers.get("Last-Modified")
+    except urllib.error.HTTPError as e:
+        if e.code == 304:
+            return 304, None, etag, last_modified
+        raise
+
+
+class SheetCache:
+    """四張內容表的本機快照 (parquet)，以 URL 與內容雜湊為鍵。
+
+    冷啟動時直接讀本機快照 (stale_ok=True 時不論新舊)；其餘情況快照超過 max_age
+    才向上游做條件式驗證，上游逾時或失敗時繼續提供最後一份成功的快照。
+    """
+
+    def __init__(self, root, max_age=300, timeout=10, metrics=NULL_METRICS):
+        self.root = root
+        self.max_age = max_age
+        self.timeout = timeout
+        self.metrics = metrics
+        os.makedirs(root, exist_ok=True)
+
+    def _key(self, url):
+        return hashlib.sha1(url.encode("utf-8")).hexdigest()[:16]
+
+    def _meta_path(self, url):
+        return os.path.join(self.root, self._key(url) + ".json")
+
+    def _data_path(self, url, content_hash):
+        return os.path.join(self.root, f"{self._key(url)}-{content_hash[:16]}.parquet")
+
+    def _read_meta(self, url):
+        try:
+            with open(self._meta_path(url), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_meta(self, url, meta):
+        path = self._meta_path(url)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp, path)
+
+    def _read_snapshot(self, url, meta):
+        if not meta:
+            return None
+        import pandas as pd
+        try:
+            return pd.read_parquet(self._data_path(url, meta["hash"]))
+        except Exception:
+            return None
+
+    def _write_snapshot(self, url, content_hash, df):
+        path = self._data_path(url, content_hash)
+        try:
+            df.to_parquet(path + ".tmp", index=False)
+            os.replace(path + ".tmp", path)
+        except Exception:
+            logger.warning("無法寫入本機快照 %s", url, exc_info=True)
+            return False
+        # 清掉同一 URL 的舊版本快照
+        for old in glob.glob(os.path.join(self.root, self._key(url) + "-*.parquet")):
+            if old != path:
+                try: os.remove(old)
+                except OSError: pass
+        return True
+
+    def load_versioned(self, url, force=False, stale_ok=False):
+        # 回傳 (DataFrame, 內容雜湊, 錯誤訊息)；force=True 時略過 max_age，一律向上游驗證；
+        # stale_ok=True 時有快照就直接回傳，由呼叫端之後在背景重新驗證。
+        # 上游失敗但有快照時回傳快照與錯誤訊息，讓呼叫端知道內容可能過期；沒有快照則直接拋出
+        meta = self._read_meta(url)
+        df = self._read_snapshot(url, meta)
+        if df is not None and not force and (stale_ok or time.time() - meta["fetched_at"] < self.max_age):
+            self.metrics.incr("sheet.snapshot_hit")
+            return df, meta["hash"], None
+
+        try:
+            with self.metrics.timer("sheet.fetch"):
+                status, body, etag, last_modified = fetch_csv(
+                    url,
+                    etag=meta.get("etag") if df is not None else None,
+                    last_modified=meta.get("last_modified") if df is not None else None,
+                    timeout=self.timeout,
+                )
+        except Exception as e:
+            if df is not None:
+                self.metrics.incr("sheet.stale_fallback")
+                logger.warning("上游 %s 讀取失敗，沿用本機快照 %s", url, meta["hash"][:8], exc_info=True)
+                return df, meta["hash"], repr(e)
+            raise
+
+        if status == 304 and df is not None:
+            self.metrics.incr("sheet.not_modified")
+            meta["fetched_at"] = time.time()
+            self._write_meta(url, meta)
+            return df, meta["hash"], None
+
+        content_hash = hashlib.sha256(body).hexdigest()
+        if df is None or content_hash != meta["hash"]:
+            self.metrics.incr("sheet.changed")
+            with self.metrics.timer("sheet.parse"):
+                df = parse_csv(body)
+            if not self._write_snapshot(url, content_hash, df):
+                return df, content_hash, None
+        self._write_meta(url, {
+            "url": url,
+            "hash": content_hash,
+            "etag": etag,
+            "last_modified": last_modified,
+            "fetched_at": time.time(),
+        })
+        return df, content_hash, None
@@ -0,0 +1,215 @@
+import logging
+import random
+import threading
+import time
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+# 429 為配額用盡，5xx 為 Google 端暫時性錯誤，其餘 4xx 重試也不會成功
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class SheetsUnavailable(RuntimeError):
+    """斷路器開啟 (降級模式) 或節流等待逾時，請求未送出。"""
+
+
+def _status_code(exc):
+    # gspread.APIError 帶 response；googleapiclient 的 HttpError 帶 resp.status
+    response = getattr(exc, "response", None)
+    status = getattr(response, "status_code", None)
+    if status is None:
+        status = getattr(getattr(exc, "resp", None), "status", None)
+    try:
+        return int(status) if status is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def is_transient(exc):
+    status = _status_code(exc)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    return isinstance(exc, (ConnectionError, TimeoutError, OSError))
+
+
+class TokenBucket:
+    """行程內共用的令牌桶，依 Sheets API 每分鐘配額補充。"""
+
+    def __init__(self, per_minute=60, burst=10):
+        self.rate = per_minute / 60.0
+        self.capacity = max(1, burst)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout=None, tokens=1):
+        # 取得 tokens 個令牌 (一次呼叫會打多個 API 請求時)，回傳等待秒數；超過 timeout 仍拿不到則回傳 None
+        tokens = min(tokens, self.capacity)
+        start = time.monotonic()
+        waited = False
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return now - start if waited else 0.0
+                wait = (tokens - self._tokens) / self.rate
+            if timeout is not None and now - start + wait > timeout:
+                return None
+            time.sleep(wait)
+            waited = True
+
+
+class CircuitBreaker:
+    """連續 failure_threshold 次暫時性失敗即開啟，reset_timeout 秒後放行一個試探請求。"""
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold=5, reset_timeout=60.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.opened_at = None
+        self._failures = 0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                return True
+            return self.state == self.CLOSED
+
+    def release_probe(self):
+        # 放行的試探請求沒有送出 (例如節流逾時)：回到開啟狀態重新計時，否則會卡在半開、永遠不再放行
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self.state, self.opened_at = self.OPEN, time.monotonic()
+
+    def record_success(self):
+        with self._lock:
+            self.state, self._failures, self.opened_at = self.CLOSED, 0, None
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning("Sheets API 連續失敗 %d 次，進入降級模式", self._failures)
+                self.state, self.opened_at = self.OPEN, time.monotonic()
+
+
+class SheetsClient:
+    """包在 GSheetsConnection 外層的配額感知呼叫器。
+
+    每次呼叫先經過斷路器與令牌桶，暫時性錯誤以指數退避 + full jitter 重試。
+    讀取可帶 key，相同 key 的並行讀取只會真的送出一次。寫入 (append) 非冪等，
+    只在 429 (請求被拒、確定未寫入) 時重試，其餘失敗交給呼叫端 (ResultLogger 的 journal) 處理。
+    """
+
+    def __init__(self, bucket=None, breaker=None, max_retries=4, base_delay=0.5, max_delay=30.0, acquire_timeout=10.0):
+        self.bucket = bucket or TokenBucket()
+        self.breaker = breaker or CircuitBreaker()
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.acquire_timeout = acquire_timeout
+
+        self._lock = threading.Lock()
+        self._inflight = {}  # key -> Future
+        self._handles = {}   # key -> 可重複使用的物件 (如 Worksheet)
+        self.stats = {
+            "calls": 0, "succeeded": 0, "failed": 0, "retries": 0,
+            "throttled": 0, "throttle_wait": 0.0, "rejected": 0, "coalesced": 0,
+        }
+
+    def _count(self, name, value=1):
+        with self._lock:
+            self.stats[name] += value
+
+    def _backoff(self, attempt):
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def call(self, fn, *args, idempotent=True, acquire_timeout=None, cost=1, **kwargs):
+        # cost 為 fn 實際送出的 API 請求數，依此扣除令牌
+        self._count("calls")
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                self._count("rejected")
+                raise SheetsUnavailable("Sheets API 降級中，暫停送出請求")
+            waited = self.bucket.acquire(self.acquire_timeout if acquire_timeout is None else acquire_timeout, cost)
+            if waited is None:
+                self.breaker.release_probe()
+                self._count("rejected")
+                raise SheetsUnavailable("Sheets API 配額已滿，節流等待逾時")
+            if waited > 0:
+                self._count("throttled")
+                self._count("throttle_wait", waited)
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                transient = is_transient(e)
+                if transient or self.breaker.state == CircuitBreaker.HALF_OPEN and _status_code(e) is None:
+                    self.breaker.record_failure()
+                elif _status_code(e) is not None:
+                    # API 有回應 (如 400 / 403)，代表服務本身正常
+                    self.breaker.record_success()
+                retry = transient if idempotent else _status_code(e) == 429
+                if not retry or attempt >= self.max_retries or self.breaker.state == CircuitBreaker.OPEN:
+                    self._count("failed")
+                    raise
+                self._count("retries")
+                time.sleep(self._backoff(attempt))
+                attempt += 1
+                continue
+            self.breaker.record_success()
+            self._count("succeeded")
+            return result
+
+    def read(self, key, fn, *args, **kwargs):
+        # 相同 key 的讀取正在進行時，直接等待同一個結果
+        with self._lock:
+            pending = self._inflight.get(key)
+            owner = pending is None
+            if owner:
+                pending = self._inflight[key] = Future()
+            else:
+                self.stats["coalesced"] += 1
+        if not owner:
+            return pending.result()
+        try:
+            result = self.call(fn, *args, **kwargs)
+        except Exception as e:
+            pending.set_exception(e)
+            raise
+        else:
+            pending.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def handle(self, key, opener, *args, cost=1, acquire_timeout=None, **kwargs):
+        # 開啟試算表 / 工作表本身就要打 API 讀 metadata，取得一次後重複使用；開啟的請求數以 cost 計入配額，
+        # acquire_timeout 與 call() 相同，讓不願久等的呼叫端 (儀表板) 連開啟也只等短時間
+        with self._lock:
+            cached = self._handles.get(key)
+        if cached is not None:
+            return cached
+        opened = self.call(opener, *args, cost=cost, acquire_timeout=acquire_timeout, **kwargs)
+        with self._lock:
+            return self._handles.setdefault(key, opened)
+
+    def write(self, fn, *args, **kwargs):
+        return self.call(fn, *args, idempotent=False, **kwargs)
+
+    def metrics(self):
+        with self._lock:
+            out = dict(self.stats)
+        out["breaker"] = self.breaker.state
+        out["tokens"] = round(self.bucket._tokens, 2)
+        return out
@@ -0,0 +1,330 @@
+"""結果頁的伺服器端分享圖：雷達圖 + 前三名推薦卡片，輸出 SVG (純 Python) 或 PNG (需 Pillow + 中文字型)。
+
+版面先排成一串繪圖指令，再交給 SVG / PNG 兩種輸出，兩者畫面一致。
+輸出依 (MBTI, 取整後的能量指數, 推薦組合) 做內容定址，存在本機磁碟並以 LRU 淘汰，
+同一種結果只需要畫一次。
+"""
+import hashlib
+import json
+import logging
+import math
+import os
+import threading
+from collections import OrderedDict
+from xml.sax.saxutils import escape
+
+from furealm import CHAKRA_ORDER
+
+logger = logging.getLogger(__name__)
+
+# 版面有變動時 +1，舊圖自然不再命中、由 LRU 淘汰
+LAYOUT_VERSION = 1
+
+WIDTH, HEIGHT = 720, 1040
+GOLD = "#d4af37"
+FONT_FAMILY = "'Noto Sans TC', 'PingFang TC', 'Microsoft JhengHei', sans-serif"
+
+# 常見的中文字型位置 (Linux / macOS / Windows)；找不到時只提供 SVG
+CJK_FONT_CANDIDATES = (
+    "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc",
+    "/usr/share/fonts/noto-cjk/NotoSansCJK-Regular.ttc",
+    "/usr/share/fonts/google-noto-cjk/NotoSansCJK-Regular.ttc",
+    "/usr/share/fonts/truetype/wqy/wqy-microhei.ttc",
+    "/usr/share/fonts/truetype/wqy/wqy-zenhei.ttc",
+    "/System/Library/Fonts/PingFang.ttc",
+    "C:/Windows/Fonts/msjh.ttc",
+)
+
+
+def _is_missing(value):
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+def product_fields(product):
+    # 與結果頁卡片相同的顯示規則 (名稱空白時改用商品編號)
+    name = product.get("Product_Name", "Fù Realm 特調")
+    if _is_missing(name):
+        name = product.get("Product_ID", "能量精選")
+    gems = product.get("Gemstones", "天然晶石組合")
+    return str(name), "天然晶石組合" if _is_missing(gems) else str(gems)
+
+
+def snapshot_key(report):
+    # 圖上的分數只顯示到整數，取整後相同的結果共用同一張圖
+    recs = tuple((target, *product_fields(p)) if p is not None else (target,) for target, p in zip(report.targets, report.products))
+    return (LAYOUT_VERSION, report.mbti.upper(), report.group, tuple(int(round(v)) for v in report.converted), recs)
+
+
+def _text_units(text):
+    # 粗估字寬：全形字 1、半形字 0.55
+    return sum(1 if ord(ch) > 0x2e80 else 0.55 for ch in text)
+
+
+def _wrap(text, width, max_lines):
+    lines, line = [], ""
+    for ch in text:
+        if _text_units(line + ch) > width:
+            lines.append(line)
+            line = ""
+            if len(lines) == max_lines:
+                break
+        line += ch
+    else:
+        if line:
+            lines.append(line)
+        return lines
+    lines[-1] = lines[-1][:-1] + "…"
+    return lines
+
+
+def layout(key):
+    """把 snapshot_key 排成繪圖指令 (座標以 WIDTH x HEIGHT 為準)。"""
+    _, mbti, group, scores, recs = key
+    ops = [("rect", 0, 0, WIDTH, HEIGHT, 0, "#ffffff", None)]
+    ops.append(("text", WIDTH / 2, 56, "全方位能量診斷報告", 30, "#333333", "middle", True))
+    ops.append(("text", WIDTH / 2, 96, f"MBTI 類型：{mbti} ({group}型氣質)" if group else f"MBTI 類型：{mbti}", 20, "#555555", "middle", False))
+
+    # 雷達圖：第一軸朝上、順時針 (與互動圖表相同)，範圍 0-100
+    cx, cy, radius = WIDTH / 2, 390, 200
+    n = len(CHAKRA_ORDER)
+
+    def point(i, value):
+        angle = math.pi / 2 - 2 * math.pi * i / n
+        r = radius * max(0.0, min(value, 100)) / 100
+        return cx + r * math.cos(angle), cy - r * math.sin(angle)
+
+    ops.append(("circle", cx, cy, radius, "#eeeeee", 1.5))
+    for level in (25, 50, 75):
+        ops.append(("circle", cx, cy, radius * level / 100, "#eeeeee", 1))
+    for i in range(n):
+        ops.append(("line", (cx, cy), point(i, 100), "#eeeeee", 1))
+    ops.append(("polygon", [point(i, v) for i, v in enumerate(scores)], GOLD, 0.3, GOLD, 4))
+    for i, v in enumerate(scores):
+        x, y = point(i, v)
+        ops.append(("circle_fill", x, y, 5, GOLD))
+    for i, (chakra, v) in enumerate(zip(CHAKRA_ORDER, scores)):
+        angle = math.pi / 2 - 2 * math.pi * i / n
+        x, y = cx + (radius + 48) * math.cos(angle), cy - (radius + 30) * math.sin(angle)
+        ops.append(("text", x, y + 8, f"{chakra} {v}", 19, GOLD, "middle", True))
+
+    # 推薦卡片
+    ops.append(("text", WIDTH / 2, 680, "您的能量校準方案", 22, "#333333", "middle", True))
+    gap, top, card_h = 20, 710, 250
+    card_w = (WIDTH - gap * 4) / 3
+    for i, rec in enumerate(recs):
+        x = gap + i * (card_w + gap)
+        ops.append(("rect", x, top, card_w, card_h, 10, "#ffffff", GOLD))
+        ops.append(("rect", x + 12, top + 14, 92, 26, 5, GOLD, None))
+        ops.append(("text", x + 58, top + 33, f"優先校準 {i + 1}", 14, "#ffffff", "middle", False))
+        ops.append(("text", x + 12, top + 72, rec[0], 20, "#333333", "start", True))
+        if len(rec) == 1:
+            ops.append(("text", x + 12, top + 106, "建議私訊預約鑑定", 15, "#666666", "start", False))
+            continue
+        _, name, gems = rec
+        y = top + 104
+        for line in _wrap(name, (card_w - 24) / 16, 2):
+            ops.append(("text", x + 12, y, line, 16, GOLD, "start", True))
+            y += 24
+        y += 6
+        for line in _wrap(gems, (card_w - 24) / 14, 3):
+            ops.append(("text", x + 12, y, line, 14, "#666666", "start", False))
+            y += 21
+        ops.append(("line", (x + 12, top + card_h - 38), (x + card_w - 12, top + card_h - 38), "#eeeeee", 1))
+        ops.append(("text", x + 12, top + card_h - 16, "針對此能量偏離進行深度校準", 12, "#999999", "start", False))
+
+    ops.append(("text", WIDTH / 2, HEIGHT - 22, "Fù Realm 能量診斷", 14, "#999999", "middle", False))
+    return ops
+
+
+def render_svg(key):
+    out = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{WIDTH}" height="{HEIGHT}" viewBox="0 0 {WIDTH} {HEIGHT}" '
+           f'font-family="{FONT_FAMILY}">']
+    for op in layout(key):
+        kind = op[0]
+        if kind == "rect":
+            _, x, y, w, h, r, fill, stroke = op
+            stroke_attr = f' stroke="{stroke}" stroke-width="1.5"' if stroke else ""
+            out.append(f'<rect x="{x:.1f}" y="{y:.1f}" width="{w:.1f}" height="{h:.1f}" rx="{r}" fill="{fill}"{stroke_attr}/>')
+        elif kind == "circle":
+            _, x, y, r, stroke, width = op
+            out.append(f'<circle cx="{x:.1f}" cy="{y:.1f}" r="{r:.1f}" fill="none" stroke="{stroke}" stroke-width="{width}"/>')
+        elif kind == "circle_fill":
+            _, x, y, r, fill = op
+            out.append(f'<circle cx="{x:.1f}" cy="{y:.1f}" r="{r}" fill="{fill}"/>')
+        elif kind == "line":
+            _, (x1, y1), (x2, y2), stroke, width = op
+            out.append(f'<line x1="{x1:.1f}" y1="{y1:.1f}" x2="{x2:.1f}" y2="{y2:.1f}" stroke="{stroke}" stroke-width="{width}"/>')
+        elif kind == "polygon":
+            _, points, fill, opacity, stroke, width = op
+            pts = " ".join(f"{x:.1f},{y:.1f}" for x, y in points)
+            out.append(f'<polygon points="{pts}" fill="{fill}" fill-opacity="{opacity}" stroke="{stroke}" '
+                       f'stroke-width="{width}" stroke-linejoin="round"/>')
+        elif kind == "text":
+            _, x, y, text, size, color, anchor, bold = op
+            weight = ' font-weight="bold"' if bold else ""
+            out.append(f'<text x="{x:.1f}" y="{y:.1f}" font-size="{size}" fill="{color}" text-anchor="{anchor}"{weight}>'
+                       f'{escape(text)}</text>')
+    out.append("</svg>")
+    return "\n".join(out).encode("utf-8")
+
+
+def find_cjk_font(path=None):
+    for candidate in ((path,) if path else ()) + CJK_FONT_CANDIDATES:
+        if candidate and os.path.exists(candidate):
+            return candidate
+    return None
+
+
+def png_available(font_path=None):
+    try:
+        import PIL  # noqa: F401
+    except ImportError:
+        return False
+    return find_cjk_font(font_path) is not None
+
+
+def render_png(key, font_path=None, scale=2):
+    # 需要 Pillow 與可顯示中文的字型；任一缺少時回傳 None (改用 SVG)
+    font_path = find_cjk_font(font_path)
+    if font_path is None:
+        return None
+    try:
+        from PIL import Image, ImageColor, ImageDraw, ImageFont
+    except ImportError:
+        return None
+    import io
+
+    fonts = {}
+
+    def font(size):
+        if size not in fonts:
+            fonts[size] = ImageFont.truetype(font_path, int(size * scale))
+        return fonts[size]
+
+    img = Image.new("RGBA", (WIDTH * scale, HEIGHT * scale), "#ffffff")
+    draw = ImageDraw.Draw(img)
+    s = lambda *values: [v * scale for v in values]
+    for op in layout(key):
+        kind = op[0]
+        if kind == "rect":
+            _, x, y, w, h, r, fill, stroke = op
+            draw.rounded_rectangle(s(x, y, x + w, y + h), radius=r * scale, fill=fill, outline=stroke, width=int(1.5 * scale) if stroke else 0)
+        elif kind == "circle":
+            _, x, y, r, stroke, width = op
+            draw.ellipse(s(x - r, y - r, x + r, y + r), outline=stroke, width=max(int(width * scale), 1))
+        elif kind == "circle_fill":
+            _, x, y, r, fill = op
+            draw.ellipse(s(x - r, y - r, x + r, y + r), fill=fill)
+        elif kind == "line":
+            _, (x1, y1), (x2, y2), stroke, width = op
+            draw.line(s(x1, y1, x2, y2), fill=stroke, width=max(int(width * scale), 1))
+        elif kind == "polygon":
+            _, points, fill, opacity, stroke, width = op
+            pts = [(x * scale, y * scale) for x, y in points]
+            # 半透明填色畫在另一層再疊回來
+            overlay = Image.new("RGBA", img.size, (0, 0, 0, 0))
+            ImageDraw.Draw(overlay).polygon(pts, fill=ImageColor.getrgb(fill) + (int(255 * opacity),))
+            img.alpha_composite(overlay)
+            draw = ImageDraw.Draw(img)
+            draw.line(pts + pts[:1], fill=stroke, width=int(width * scale), joint="curve")
+        elif kind == "text":
+            _, x, y, text, size, color, anchor, bold = op
+            # SVG 的 y 為基線；Pillow 以 ls (左基線) / ms (中基線) 對齊
+            draw.text(s(x, y), text, fill=color, font=font(size), anchor={"start": "ls", "middle": "ms", "end": "rs"}[anchor],
+                      stroke_width=1 if bold else 0, stroke_fill=color)
+    buf = io.BytesIO()
+    img.convert("RGB").save(buf, format="PNG", optimize=True)
+    return buf.getvalue()
+
+
+class SnapshotCache:
+    """內容定址的磁碟快取：檔名為鍵的雜湊，依總位元組數以 LRU 淘汰 (以檔案 mtime 記錄最近使用)。"""
+
+    def __init__(self, root, max_bytes=64 * 1024 * 1024):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._items = OrderedDict()  # 檔名 -> 位元組數，依最近使用排序
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+        os.makedirs(root, exist_ok=True)
+        # 重啟後沿用既有的圖，依 mtime 還原 LRU 順序
+        entries = []
+        for name in os.listdir(root):
+            if name.endswith(".tmp"):
+                continue
+            try:
+                st = os.stat(os.path.join(root, name))
+            except OSError:
+                continue
+            entries.append((st.st_mtime, name, st.st_size))
+        for _, name, size in sorted(entries):
+            self._items[name] = size
+            self.size += size
+        with self._lock:
+            self._evict()
+
+    @staticmethod
+    def digest(key):
+        return hashlib.sha256(json.dumps(key, ensure_ascii=False).encode("utf-8")).hexdigest()[:32]
+
+    def _name(self, key, fmt):
+        return f"{self.digest(key)}.{fmt}"
+
+    def get(self, key, fmt):
+        name = self._name(key, fmt)
+        path = os.path.join(self.root, name)
+        with self._lock:
+            if name not in self._items:
+                self.stats["misses"] += 1
+                return None
+            self._items.move_to_end(name)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+        except OSError:
+            with self._lock:
+                self.size -= self._items.pop(name, 0)
+                self.stats["misses"] += 1
+            return None
+        with self._lock:
+            self.stats["hits"] += 1
+        return data
+
+    def put(self, key, fmt, data):
+        if len(data) > self.max_bytes:
+            return
+        name = self._name(key, fmt)
+        path = os.path.join(self.root, name)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except OSError:
+            logger.warning("無法寫入分享圖快取 %s", path, exc_info=True)
+            return
+        with self._lock:
+            self.size += len(data) - self._items.pop(name, 0)
+            self._items[name] = len(data)
+            self._evict()
+
+    def _evict(self):
+        while self.size > self.max_bytes and self._items:
+            name, size = self._items.popitem(last=False)
+            self.size -= size
+            self.stats["evictions"] += 1
+            try: os.remove(os.path.join(self.root, name))
+            except OSError: pass
+
+    def get_or_render(self, key, fmt, render):
+        data = self.get(key, fmt)
+        if data is None:
+            data = render(key)
+            if data is not None:
+                self.put(key, fmt, data)
+        return data
+
+    def __len__(self):
+        return len(self._items)